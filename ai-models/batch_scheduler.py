@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+ReFlow AI Batch Scheduler
+Eşzamanlı analiz isteklerini model başına dinamik mikro yığınlarda toplayan asyncio ön yüzü
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from defect_detection import ImageContext
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class QueueFullError(RuntimeError):
+    """Model kuyruğu dolu; istemci daha sonra yeniden denemeli"""
+
+class MicroBatcher:
+    """Tek model için dinamik mikro yığınlayıcı
+    
+    İlk istek geldikten sonra en fazla `max_wait_ms` beklenir ya da yığın `max_batch_size`
+    boyutuna ulaşınca `batch_fn` tek çağrıda çalıştırılır. Model çağrısı modele ayrılmış
+    tek bir iş parçacığında yapılır, olay döngüsü bloklanmaz; o sırada gelen istekler bir
+    sonraki yığına birikir. Kuyruk `max_queue` ile sınırlıdır (geri basınç). Durdurulunca
+    kuyruktaki ve işlenmekte olan yığındaki istekler iptal edilir; yeniden başlatılabilir.
+    """
+    
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0, max_queue: int = 256):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.max_queue = max_queue
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes = deque(maxlen=1000)
+        self.queue_ms = deque(maxlen=1000)
+        self._queue = None
+        self._task = None
+        self._executor = None
+        # Kuyruktan alınmış ama sonucu henüz dağıtılmamış yığın
+        self._inflight = []
+    
+    def start(self):
+        """Yığınlama döngüsünü çalışan olay döngüsünde başlatır"""
+        if self._task is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"batch-{self.name}")
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=f"batcher-{self.name}")
+    
+    async def stop(self):
+        """Döngüyü durdurur, bekleyen ve işlenmekte olan istekleri iptal eder"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        pending, self._inflight = self._inflight, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.cancel()
+        if self._executor is not None:
+            # Çalışan model çağrısı beklenmez; sonucu atılır
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    async def submit(self, item: Any) -> Any:
+        """Girdiyi kuyruğa ekler, ait olduğu yığın işlenince sonucunu döndürür"""
+        if self._task is None:
+            self.start()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{self.name} kuyruğu dolu ({self.max_queue})")
+        return await future
+    
+    async def _collect(self) -> List:
+        """İlk girdiyi bekler; yığın dolana ya da bekleme süresi bitene kadar toplar"""
+        batch = self._inflight = [await self._queue.get()]
+        # Süre ilk isteğin kuyruğa girdiği andan sayılır (önceki yığını beklediği süre dahil)
+        deadline = batch[0][2] + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            # Hazır bekleyenler beklemeden alınır
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # İstemcisi vazgeçen istekler işlenmez
+            batch = self._inflight = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+            
+            now = time.perf_counter()
+            self.queue_ms.extend((now - queued) * 1000 for _, _, queued in batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn,
+                                                     [item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name} batch_fn returned {len(results)} results "
+                                       f"for {len(batch)} inputs")
+            except Exception as e:
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._inflight = []
+                continue
+            
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_sizes.append(len(batch))
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self._inflight = []
+    
+    def stats(self) -> Dict:
+        queue_ms = np.array(self.queue_ms) if self.queue_ms else np.zeros(1)
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'queue_p50_ms': float(np.percentile(queue_ms, 50)),
+            'queue_p99_ms': float(np.percentile(queue_ms, 99)),
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms
+        }
+
+def build_batchers(models: List[str], max_batch_size: int = 8, max_wait_ms: float = 10.0,
+                   max_queue: int = 256) -> Dict[str, MicroBatcher]:
+    """Seçilen modelleri yükler ve her biri için toplu çağrı yapan mikro yığınlayıcı kurar"""
+    from advanced_detection import ResNetDefectClassifier, VisionTransformerAnalyzer, YOLOv8DefectDetector
+    
+    batch_fns = {}
+    for name in models:
+        if name == 'resnet':
+            classifier = ResNetDefectClassifier()
+            batch_fns[name] = lambda images, model=classifier: model.classify_batch(
+                images, batch_size=len(images), num_workers=0)
+        elif name == 'vit':
+            batch_fns[name] = VisionTransformerAnalyzer().analyze_batch
+        elif name == 'yolo':
+            batch_fns[name] = YOLOv8DefectDetector().detect_batch
+        else:
+            raise ValueError(f"Bilinmeyen model: {name}")
+        logger.info(f"Model ready for batching: {name}")
+    
+    return {name: MicroBatcher(name, batch_fn, max_batch_size, max_wait_ms, max_queue)
+            for name, batch_fn in batch_fns.items()}
+
+def load_context(image_path: str) -> ImageContext:
+    """Görüntüyü istek tarafında çözer (yığın iş parçacığı yalnızca model çalıştırır)"""
+    context = ImageContext(image_path=image_path)
+    context.rgb
+    return context
+
+def create_app(batchers: Dict[str, MicroBatcher]):
+    """Mikro yığınlı model uç noktalarını sunan FastAPI uygulamasını oluşturur"""
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+    
+    class AnalyzeRequest(BaseModel):
+        image_path: str
+    
+    @asynccontextmanager
+    async def lifespan(app):
+        for batcher in batchers.values():
+            batcher.start()
+        yield
+        for batcher in batchers.values():
+            await batcher.stop()
+    
+    app = FastAPI(title='ReFlow AI Batch Scheduler', lifespan=lifespan)
+    
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok', 'models': {name: batcher.stats() for name, batcher in batchers.items()}}
+    
+    @app.post('/analyze/{model}')
+    async def analyze(model: str, request: AnalyzeRequest):
+        if model not in batchers:
+            raise HTTPException(status_code=404, detail=f"Model yüklü değil: {model}")
+        if not os.path.exists(request.image_path):
+            raise HTTPException(status_code=400, detail=f"Görüntü bulunamadı: {request.image_path}")
+        
+        start = time.perf_counter()
+        try:
+            # Çözme istekler arasında paralel, model çağrısı yığın halinde
+            context = await asyncio.to_thread(load_context, request.image_path)
+            result = await batchers[model].submit(context)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except Exception as e:
+            logger.error(f"Analiz hatası: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+        
+        return {
+            'model': model,
+            'result': result,
+            'latency_ms': (time.perf_counter() - start) * 1000
+        }
+    
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description='ReFlow AI micro-batching analysis service')
+    parser.add_argument('--models', type=str, default='resnet,vit,yolo',
+                        help='Comma-separated models to serve (resnet, vit, yolo)')
+    parser.add_argument('--max-batch-size', type=int, default=8, help='Largest batch per model call')
+    parser.add_argument('--max-wait-ms', type=float, default=10.0,
+                        help='Longest time the first queued request waits for a batch to fill')
+    parser.add_argument('--max-queue', type=int, default=256, help='Queued requests per model before 503')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Bind address')
+    parser.add_argument('--port', type=int, default=8767, help='Port')
+    args = parser.parse_args()
+    
+    import uvicorn
+    
+    batchers = build_batchers(args.models.split(','), args.max_batch_size, args.max_wait_ms, args.max_queue)
+    app = create_app(batchers)
+    logger.info(f"Batch scheduler listening on http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+MicroBatcher verim ve kuyruk gecikmesi karşılaştırması
+Sabit hızda gelen eşzamanlı istekler tek tek (yığın 1) ve dinamik mikro yığınlarla işlenir
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from common import synthetic_uv_image
+from batch_scheduler import MicroBatcher, build_batchers
+from defect_detection import ImageContext
+
+async def load(batcher: MicroBatcher, contexts, rate: float) -> dict:
+    """`rate` istek/sn hızında istek gönderir; uçtan uca gecikmeleri ölçer"""
+    batcher.start()
+    latencies = []
+    
+    async def request(context):
+        start = time.perf_counter()
+        await batcher.submit(context)
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    start = time.perf_counter()
+    tasks = []
+    for i, context in enumerate(contexts):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(request(context)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'requests_per_sec': len(contexts) / elapsed,
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'mean_batch_size': batcher.stats()['mean_batch_size']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-batching scheduler benchmark')
+    parser.add_argument('--model', type=str, default='resnet', choices=['resnet', 'vit', 'yolo'])
+    parser.add_argument('--requests', type=int, default=48, help='İstek sayısı')
+    parser.add_argument('--rate', type=float, default=20.0, help='Gelen istek hızı (istek/sn)')
+    parser.add_argument('--max-batch-size', type=int, default=8, help='Dinamik yığın üst sınırı')
+    parser.add_argument('--max-wait-ms', type=float, default=10.0, help='Yığın dolması için en uzun bekleme')
+    args = parser.parse_args()
+    
+    batch_fn = build_batchers([args.model])[args.model].batch_fn
+    contexts = [ImageContext(image=synthetic_uv_image(480, 640, seed=i)) for i in range(args.requests)]
+    batch_fn(contexts[:2])  # ısınma
+    
+    results = {}
+    for name, max_batch_size, max_wait_ms in (('batch_size_1', 1, 0.0),
+                                              ('micro_batching', args.max_batch_size, args.max_wait_ms)):
+        batcher = MicroBatcher(args.model, batch_fn, max_batch_size, max_wait_ms, max_queue=args.requests)
+        
+        async def run():
+            try:
+                return await load(batcher, contexts, args.rate)
+            finally:
+                await batcher.stop()
+        
+        results[name] = asyncio.run(run())
+    
+    results['throughput_gain'] = (results['micro_batching']['requests_per_sec']
+                                  / results['batch_size_1']['requests_per_sec'])
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+IntegratedAnalysisEngine kademeli mod verimi
+Karışık temiz/kusurlu görüntü kümesinde tüm analizörler ile kademeli mod karşılaştırılır
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+import cv2
+
+from common import synthetic_uv_image
+from advanced_detection import IntegratedAnalysisEngine
+
+def write_image_set(output_dir: str, count: int, defective_ratio: float, height: int, width: int):
+    """Sentetik temiz ve kusurlu görüntüleri diske yazar, yolları döndürür"""
+    paths = []
+    defective = int(round(count * defective_ratio))
+    for i in range(count):
+        path = os.path.join(output_dir, f"image_{i:03d}.png")
+        cv2.imwrite(path, synthetic_uv_image(height, width, seed=i, defects=i < defective))
+        paths.append(path)
+    return paths
+
+def run(engine: IntegratedAnalysisEngine, paths, cascade: bool) -> dict:
+    """Görüntü/saniye ile aşama sayımlarını ölçer; ilk görüntü ısınma içindir"""
+    engine.comprehensive_analysis(paths[0], cascade=cascade)
+    stages, decided = Counter(), Counter()
+    start = time.perf_counter()
+    for path in paths:
+        report = engine.comprehensive_analysis(path, cascade=cascade)
+        if cascade:
+            stages.update(report['cascade']['stages_run'])
+            decided[report['cascade']['decided_by']] += 1
+    elapsed = time.perf_counter() - start
+    result = {'images_per_sec': len(paths) / elapsed, 'mean_ms': elapsed / len(paths) * 1000}
+    if cascade:
+        result['stage_runs'] = dict(stages)
+        result['decided_by'] = dict(decided)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Cascade vs full ensemble throughput benchmark')
+    parser.add_argument('--images', type=int, default=20, help='Görüntü sayısı')
+    parser.add_argument('--defective-ratio', type=float, default=0.3, help='Kusurlu görüntü oranı')
+    parser.add_argument('--size', type=int, nargs=2, default=(480, 640), metavar=('H', 'W'),
+                        help='Görüntü boyutu')
+    parser.add_argument('--band', type=float, nargs=2, default=(0.35, 0.75), metavar=('LOW', 'HIGH'),
+                        help='Belirsiz güven bandı')
+    parser.add_argument('--executor', type=str, default='thread', help='Analizör yürütücüsü')
+    args = parser.parse_args()
+    
+    engine = IntegratedAnalysisEngine(executor=args.executor, cascade_band=tuple(args.band))
+    try:
+        with tempfile.TemporaryDirectory() as image_dir:
+            paths = write_image_set(image_dir, args.images, args.defective_ratio, *args.size)
+            results = {
+                'full': run(engine, paths, cascade=False),
+                'cascade': run(engine, paths, cascade=True)
+            }
+    finally:
+        engine.close()
+    
+    results['speedup'] = results['cascade']['images_per_sec'] / results['full']['images_per_sec']
+    results['images'] = args.images
+    results['defective_ratio'] = args.defective_ratio
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
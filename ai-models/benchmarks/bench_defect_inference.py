@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+DefectDetectionModel tek görüntü gecikme karşılaştırması
+Keras model.predict döngüsü ile sabit imzalı çıkarım fonksiyonu (ve XLA) karşılaştırılır
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from common import latency_summary, time_calls
+from defect_detection import DefectDetectionModel
+
+def main():
+    parser = argparse.ArgumentParser(description='DefectDetectionModel inference latency benchmark')
+    parser.add_argument('--model', type=str, help='Model dosyası yolu (yoksa rastgele ağırlıklar)')
+    parser.add_argument('--repeats', type=int, default=30, help='Ölçüm tekrarı')
+    parser.add_argument('--xla', action='store_true', help='XLA derlemeli çıkarımı da ölç')
+    args = parser.parse_args()
+    
+    detector = DefectDetectionModel(model_path=args.model)
+    image = np.random.default_rng(0).random((1, *detector.input_shape), dtype=np.float32)
+    
+    results = {
+        'keras_predict': latency_summary(time_calls(
+            lambda: detector.model.predict(image, verbose=0), args.repeats)),
+        'inference_function': latency_summary(time_calls(
+            lambda: detector.predict_batch(image), args.repeats))
+    }
+    
+    if args.xla:
+        xla_detector = DefectDetectionModel(model_path=args.model, xla=True)
+        xla_detector.model.set_weights(detector.model.get_weights())
+        results['inference_function_xla'] = latency_summary(time_calls(
+            lambda: xla_detector.predict_batch(image), args.repeats))
+    
+    baseline = results['keras_predict']['p50_ms']
+    for name, summary in results.items():
+        summary['speedup_vs_predict'] = baseline / summary['p50_ms']
+    
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
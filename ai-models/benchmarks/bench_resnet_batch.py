@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+ResNetDefectClassifier toplu çıkarım verimi karşılaştırması
+Tek görüntülü classify_defect döngüsü ile DataLoader'lı classify_batch (ve derlenmiş modeller) karşılaştırılır
+"""
+
+import argparse
+import json
+import time
+
+import torch
+
+from common import synthetic_uv_image
+from advanced_detection import ResNetDefectClassifier
+
+def throughput(fn, images, repeats: int) -> float:
+    """Görüntü/saniye; ilk (ısınma) çağrı ölçüme dahil edilmez"""
+    fn(images[:2])
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(images)
+    return len(images) * repeats / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description='ResNet batched inference throughput benchmark')
+    parser.add_argument('--images', type=int, default=64, help='Görüntü sayısı')
+    parser.add_argument('--batch-size', type=int, default=16, help='Yığın boyutu')
+    parser.add_argument('--workers', type=int, default=2, help='DataLoader işçi sayısı')
+    parser.add_argument('--repeats', type=int, default=2, help='Ölçüm tekrarı')
+    parser.add_argument('--compile', action='store_true', help='torch.compile modunu da ölç')
+    args = parser.parse_args()
+    
+    images = [synthetic_uv_image(480, 640, seed=i) for i in range(args.images)]
+    classifier = ResNetDefectClassifier()
+    
+    def batch_fn(model, workers):
+        return lambda items: model.classify_batch(items, batch_size=args.batch_size, num_workers=workers)
+    
+    results = {
+        'single_image_loop': throughput(
+            lambda items: [classifier.classify_defect(image) for image in items], images, args.repeats),
+        'classify_batch': throughput(batch_fn(classifier, 0), images, args.repeats),
+        'classify_batch_workers': throughput(batch_fn(classifier, args.workers), images, args.repeats)
+    }
+    
+    modes = ['trace'] + (['compile'] if args.compile else [])
+    for mode in modes:
+        compiled = ResNetDefectClassifier(compile_mode=mode)
+        compiled.model.load_state_dict(classifier.model.state_dict())
+        results[f'classify_batch_{mode}'] = throughput(
+            batch_fn(compiled, args.workers), images, args.repeats)
+    
+    baseline = results['single_image_loop']
+    report = {
+        name: {'images_per_sec': value, 'speedup': value / baseline}
+        for name, value in results.items()
+    }
+    report['torch_threads'] = torch.get_num_threads()
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
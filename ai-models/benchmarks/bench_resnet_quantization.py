@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+ResNetDefectClassifier int8 nicemleme karşılaştırması
+Float ve statik int8 modelin gecikme, model boyutu ve doğruluk farkları raporlanır
+"""
+
+import argparse
+import io
+import json
+import os
+
+import numpy as np
+import torch
+
+from common import latency_summary, synthetic_uv_image, time_calls
+from advanced_detection import ResNetDefectClassifier
+from defect_detection import list_images
+
+def serialized_bytes(model: torch.nn.Module) -> int:
+    """state_dict'in torch.save ile serileştirilmiş boyutu"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+def labelled_images(data_dir: str):
+    """Sınıf adlı alt klasörlerden (görüntü yolu, sınıf adı) listesi"""
+    items = []
+    for class_name in ResNetDefectClassifier.CLASS_NAMES:
+        class_dir = os.path.join(data_dir, class_name)
+        if os.path.isdir(class_dir):
+            items.extend((path, class_name) for path in list_images(class_dir))
+    return items
+
+def main():
+    parser = argparse.ArgumentParser(description='ResNet int8 quantization benchmark')
+    parser.add_argument('--calibration-dir', type=str, help='Kalibrasyon görüntü klasörü (yoksa sentetik)')
+    parser.add_argument('--calibration-images', type=int, default=32, help='Sentetik kalibrasyon görüntü sayısı')
+    parser.add_argument('--eval-dir', type=str, help='Sınıf alt klasörlü etiketli değerlendirme kümesi')
+    parser.add_argument('--eval-images', type=int, default=32, help='Sentetik değerlendirme görüntü sayısı')
+    parser.add_argument('--repeats', type=int, default=20, help='Gecikme ölçüm tekrarı')
+    args = parser.parse_args()
+    
+    if args.calibration_dir:
+        calibration = list_images(args.calibration_dir)
+    else:
+        calibration = [synthetic_uv_image(480, 640, seed=i) for i in range(args.calibration_images)]
+    
+    labels = None
+    if args.eval_dir:
+        items = labelled_images(args.eval_dir)
+        evaluation = [path for path, _ in items]
+        labels = [label for _, label in items]
+    else:
+        evaluation = [synthetic_uv_image(480, 640, seed=1000 + i) for i in range(args.eval_images)]
+    
+    float_model = ResNetDefectClassifier()
+    int8_model = ResNetDefectClassifier()
+    int8_model.model.load_state_dict(float_model.model.state_dict())
+    int8_model.quantize(calibration)
+    
+    report = {}
+    sample = evaluation[0]
+    for name, classifier in (('float32', float_model), ('int8', int8_model)):
+        report[name] = {
+            'latency_single': latency_summary(time_calls(
+                lambda: classifier.classify_defect(sample), args.repeats)),
+            'size_mb': serialized_bytes(classifier.model) / 1e6
+        }
+    
+    float_results = float_model.classify_batch(evaluation)
+    int8_results = int8_model.classify_batch(evaluation)
+    
+    float_probs = np.array([[r['all_probabilities'][c] for c in float_model.CLASS_NAMES] for r in float_results])
+    int8_probs = np.array([[r['all_probabilities'][c] for c in int8_model.CLASS_NAMES] for r in int8_results])
+    accuracy = {
+        'top1_agreement': float(np.mean(float_probs.argmax(1) == int8_probs.argmax(1))),
+        'mean_abs_probability_delta': float(np.abs(float_probs - int8_probs).mean()),
+        'max_abs_probability_delta': float(np.abs(float_probs - int8_probs).max())
+    }
+    if labels is not None:
+        for name, results in (('float32', float_results), ('int8', int8_results)):
+            accuracy[f'{name}_accuracy'] = float(np.mean(
+                [r['predicted_class'] == label for r, label in zip(results, labels)]))
+        accuracy['accuracy_delta'] = accuracy['int8_accuracy'] - accuracy['float32_accuracy']
+    
+    report['speedup_single'] = report['float32']['latency_single']['p50_ms'] / report['int8']['latency_single']['p50_ms']
+    report['size_ratio'] = report['int8']['size_mb'] / report['float32']['size_mb']
+    report['accuracy'] = accuracy
+    report['eval_images'] = len(evaluation)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
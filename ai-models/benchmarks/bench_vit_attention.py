@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+VisionTransformerAnalyzer attention rollout ek yükü
+Yalnızca tahmin (SDPA) ile aynı geçişte attention + rollout (eager) gecikmeleri karşılaştırılır
+"""
+
+import argparse
+import json
+
+import numpy as np
+import torch
+
+from common import latency_summary, synthetic_uv_image, time_calls
+from advanced_detection import VisionTransformerAnalyzer
+
+def main():
+    parser = argparse.ArgumentParser(description='ViT attention rollout overhead benchmark')
+    parser.add_argument('--model', type=str, default='google/vit-base-patch16-224', help='Model adı veya yolu')
+    parser.add_argument('--repeats', type=int, default=20, help='Ölçüm tekrarı')
+    args = parser.parse_args()
+    
+    image = synthetic_uv_image(480, 640)
+    plain = VisionTransformerAnalyzer(args.model, with_attention=False)
+    attention = VisionTransformerAnalyzer(args.model, with_attention=True)
+    attention.model.load_state_dict(plain.model.state_dict())
+    
+    # Rollout hesabının tek başına süresi (ileri geçiş hariç)
+    inputs = attention.processor(images=np.ascontiguousarray(image[..., ::-1]), return_tensors='pt')
+    with torch.inference_mode():
+        attentions = attention.model(**inputs, output_attentions=True).attentions
+    
+    results = {
+        'predictions_only': latency_summary(time_calls(lambda: plain.analyze_image(image), args.repeats)),
+        'with_attention': latency_summary(time_calls(lambda: attention.analyze_image(image), args.repeats)),
+        'rollout_only': latency_summary(time_calls(
+            lambda: attention._extract_attention_maps(attentions), args.repeats))
+    }
+    baseline = results['predictions_only']['p50_ms']
+    results['attention_overhead_pct'] = (results['with_attention']['p50_ms'] / baseline - 1) * 100
+    results['rollout_overhead_pct'] = results['rollout_only']['p50_ms'] / baseline * 100
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+VisionTransformerAnalyzer soğuk başlatma süresi
+Hub adından yükleme ile yerel safetensors anlık görüntüsünden yükleme ayrı süreçlerde karşılaştırılır
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+MODEL_NAME = 'google/vit-base-patch16-224'
+
+def child(model_name: str, with_attention: bool):
+    """Yeni süreçte kurulum ve ilk çıkarım süresini ölçer, JSON olarak yazdırır"""
+    start = time.perf_counter()
+    from common import synthetic_uv_image
+    from advanced_detection import VisionTransformerAnalyzer
+    imported = time.perf_counter()
+    analyzer = VisionTransformerAnalyzer(model_name, with_attention=with_attention)
+    constructed = time.perf_counter()
+    analyzer.analyze_image(synthetic_uv_image(224, 224))
+    first = time.perf_counter()
+    print(json.dumps({
+        'import_s': imported - start,
+        'construct_s': constructed - imported,
+        'first_inference_s': first - constructed
+    }))
+
+def measure(model_name: str, with_attention: bool, repeats: int) -> dict:
+    """Her tekrar için ayrı Python süreci başlatır (gerçek soğuk başlatma)"""
+    runs = []
+    for _ in range(repeats):
+        command = [sys.executable, os.path.abspath(__file__), '--child', model_name]
+        if with_attention:
+            command.append('--with-attention')
+        start = time.perf_counter()
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        run['process_s'] = time.perf_counter() - start
+        runs.append(run)
+    return {key: float(np.median([run[key] for run in runs])) for key in runs[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description='ViT analyzer cold start benchmark')
+    parser.add_argument('--snapshot-dir', type=str, default='vit_snapshot',
+                        help='Yerel anlık görüntü klasörü (yoksa oluşturulur)')
+    parser.add_argument('--repeats', type=int, default=3, help='Soğuk başlatma tekrarı')
+    parser.add_argument('--with-attention', action='store_true', help='Attention rollout açık (eager)')
+    parser.add_argument('--child', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        return child(args.child, args.with_attention)
+    
+    if not os.path.isfile(os.path.join(args.snapshot_dir, 'config.json')):
+        from advanced_detection import VisionTransformerAnalyzer
+        VisionTransformerAnalyzer(MODEL_NAME).save_snapshot(args.snapshot_dir)
+    
+    results = {
+        'hub': measure(MODEL_NAME, args.with_attention, args.repeats),
+        'snapshot': measure(os.path.abspath(args.snapshot_dir), args.with_attention, args.repeats)
+    }
+    results['construct_speedup'] = results['hub']['construct_s'] / results['snapshot']['construct_s']
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
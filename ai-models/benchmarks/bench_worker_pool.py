@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+WorkerPool verimi ve görüntü aktarım maliyeti
+Tek süreçli IntegratedAnalysisEngine ile sıcak modelli işçi süreç havuzu aynı görüntülerde karşılaştırılır
+"""
+
+import argparse
+import json
+import pickle
+import time
+
+import numpy as np
+
+from common import latency_summary, synthetic_uv_image, time_calls
+from defect_detection import DefectDetectionModel, ImageContext, analyze_context
+from advanced_detection import ANALYZERS, IntegratedAnalysisEngine, default_thread_budgets
+from worker_pool import DEFECT_KIND, SharedImageRing, WorkerPool
+
+def transport(image: np.ndarray, repeats: int) -> dict:
+    """Görüntüyü pickle ile aktarma ile paylaşımlı bellek yuvasına yazma karşılaştırması"""
+    ring = SharedImageRing(1, image.nbytes)
+    try:
+        return {
+            'image_mb': image.nbytes / 1024 / 1024,
+            'pickle': latency_summary(time_calls(
+                lambda: pickle.loads(pickle.dumps(image, protocol=pickle.HIGHEST_PROTOCOL)), repeats)),
+            'shared_memory': latency_summary(time_calls(lambda: ring.write(0, image), repeats))
+        }
+    finally:
+        ring.close()
+
+def single_process(images, analyses, with_defect: bool) -> dict:
+    """Tüm modeller tek süreçte: analizörler iş parçacıklarında, TF modeli ardından"""
+    start = time.perf_counter()
+    engine = IntegratedAnalysisEngine(executor='thread')
+    detector = DefectDetectionModel() if with_defect else None
+    engine.run_analyses(images[0], analyses)
+    startup = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        for image in images:
+            engine.run_analyses(image, analyses)
+            if detector is not None:
+                analyze_context(detector, ImageContext(image=image))
+        elapsed = time.perf_counter() - start
+    finally:
+        engine.close()
+    return {'startup_s': startup, 'images_per_sec': len(images) / elapsed}
+
+def worker_pool(images, analyses, with_defect: bool, workers: int, slot_mb: float) -> dict:
+    """Her model kendi sürecinde; görüntüler ardışık gönderilir, halka dolunca beklenir"""
+    budgets = default_thread_budgets()
+    kinds = {name: workers for name in analyses}
+    methods = {name: ANALYZERS[name][1] for name in analyses}
+    if with_defect:
+        kinds[DEFECT_KIND] = workers
+        methods[DEFECT_KIND] = 'analyze'
+        budgets[DEFECT_KIND] = budgets['resnet']
+    
+    start = time.perf_counter()
+    with WorkerPool(kinds, threads=budgets, slot_mb=slot_mb) as pool:
+        startup = time.perf_counter() - start
+        for future in [pool.submit(kind, method, images[0]) for kind, method in methods.items()]:
+            future.result()
+        
+        start = time.perf_counter()
+        futures = [pool.submit(kind, method, image) for image in images for kind, method in methods.items()]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+        health = pool.health()
+    
+    return {
+        'startup_s': startup,
+        'images_per_sec': len(images) / elapsed,
+        'restarts': sum(w['restarts'] for ws in health['workers'].values() for w in ws)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Worker pool vs single-process engine benchmark')
+    parser.add_argument('--images', type=int, default=12, help='Görüntü sayısı')
+    parser.add_argument('--size', type=int, nargs=2, default=(3648, 5472), metavar=('H', 'W'),
+                        help='Görüntü boyutu (varsayılan 20 MP)')
+    parser.add_argument('--analyses', type=str, default='yolo,resnet,spectral',
+                        help='Virgülle ayrılmış analizörler')
+    parser.add_argument('--defect', action='store_true', help='TensorFlow DefectDetectionModel de çalışsın')
+    parser.add_argument('--workers', type=int, default=1, help='Model başına işçi süreç')
+    parser.add_argument('--repeats', type=int, default=10, help='Aktarım ölçüm tekrarı')
+    args = parser.parse_args()
+    
+    analyses = args.analyses.split(',')
+    images = [synthetic_uv_image(*args.size, seed=i) for i in range(args.images)]
+    slot_mb = images[0].nbytes / 1024 / 1024 + 1
+    
+    results = {
+        'transport': transport(images[0], args.repeats),
+        'single_process': single_process(images, analyses, args.defect),
+        'worker_pool': worker_pool(images, analyses, args.defect, args.workers, slot_mb)
+    }
+    results['throughput_gain'] = (results['worker_pool']['images_per_sec']
+                                  / results['single_process']['images_per_sec'])
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+ReFlow AI benchmark paketi
+Sentetik UV penetrant görüntüleri ve rastgele ağırlıklı modellerle çevrimdışı gecikme, verim ve
+bellek ölçümü; sonuçlar JSON olarak kaydedilir ve saklanan taban çizgisiyle karşılaştırılır
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from importlib import metadata
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from common import latency_summary, synthetic_uv_image, time_calls
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Ağırlık indirmeden (ağ erişimi olmadan) kurulum
+RANDOM_WEIGHTS = {'yolo': {'pretrained': False}, 'resnet': {'pretrained': False}, 'vit': {'pretrained': False}}
+
+IMAGE_GROUPS = ('yolo', 'resnet', 'vit', 'spectral', 'engine', 'defect')
+RESEARCH_CASES = ('quality_train', 'quality_predict', 'filtration', 'operation',
+                  'anomaly_train', 'anomaly_detect')
+GROUPS = IMAGE_GROUPS + ('research',)
+DEFAULT_RESOLUTIONS = '480x640,1080x1920,3648x5472'
+
+# Sonuçlarla birlikte kaydedilen sürümler; yavaşlamanın bağımlılıktan gelip gelmediği görülür
+PACKAGES = ('numpy', 'opencv-python', 'opencv-python-headless', 'torch', 'torchvision', 'transformers',
+            'tensorflow', 'scikit-learn', 'scipy', 'albumentations', 'ultralytics')
+
+# Metrik -> daha büyük değer iyi mi
+METRICS = {'p50_ms': False, 'p99_ms': False, 'throughput_per_s': True, 'peak_rss_mb': False}
+
+def parse_resolution(text: str) -> Tuple[int, int]:
+    """'YxG' (yükseklik x genişlik) biçimini çözer"""
+    height, width = (int(value) for value in text.lower().split('x'))
+    return height, width
+
+def case_names(groups: List[str], resolutions: List[Tuple[int, int]]) -> List[str]:
+    """Görüntü gruplarında çözünürlük başına, araştırma algoritmalarında algoritma başına bir durum"""
+    names = []
+    for group in groups:
+        if group == 'research':
+            names.extend(f"research.{case}" for case in RESEARCH_CASES)
+        else:
+            names.extend(f"{group}@{height}x{width}" for height, width in resolutions)
+    return names
+
+def set_threads(threads: int, tensorflow: bool):
+    """cv2, torch ve (gerekirse) TensorFlow iş parçacığı sayısını sabitler"""
+    import cv2
+    import torch
+    cv2.setNumThreads(threads)
+    torch.set_num_threads(threads)
+    if tensorflow:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+def sensor_samples(rng: np.random.Generator, count: int) -> List[Dict]:
+    """Demo değerleri etrafında sentetik sensör ölçümleri"""
+    return [{
+        'temperature': float(rng.normal(28, 3)),
+        'ph': float(rng.normal(7.0, 0.2)),
+        'conductivity': float(rng.normal(0.0012, 0.0002)),
+        'viscosity': float(rng.normal(0.002, 0.0002)),
+        'density': float(rng.normal(955, 5)),
+        'surface_tension': float(rng.normal(0.025, 0.001)),
+        'flow_rate': float(rng.normal(1.0, 0.1)),
+        'pressure': float(rng.normal(2.0, 0.2)),
+        'turbidity': float(abs(rng.normal(0.1, 0.02)))
+    } for _ in range(count)]
+
+def build_research_case(case: str, seed: int) -> Callable:
+    """Araştırma algoritmasını sentetik sensör verisiyle hazırlar"""
+    from research_algorithms import (AnomalyDetectionSystem, OptimalFiltrationDesigner,
+                                     PenetrantQualityPredictor, SystemPerformanceOptimizer)
+    
+    rng = np.random.default_rng(seed)
+    samples = sensor_samples(rng, 200)
+    scores = [90 - 20 * abs(s['ph'] - 7.0) - 0.5 * abs(s['temperature'] - 28) + float(rng.normal(0, 2))
+              for s in samples]
+    
+    if case.startswith('quality'):
+        predictor = PenetrantQualityPredictor()
+        if case == 'quality_train':
+            return lambda: predictor.train_model(samples, scores)
+        predictor.train_model(samples, scores)
+        return lambda: predictor.predict_quality(samples[0])
+    if case == 'filtration':
+        designer = OptimalFiltrationDesigner()
+        contamination = {'total_contamination': 0.15, 'particle_size_dist': [0.1, 0.3, 0.4, 0.2]}
+        return lambda: designer.optimize_filtration_sequence(contamination, target_purity=0.98)
+    if case == 'operation':
+        optimizer = SystemPerformanceOptimizer()
+        performance = {'efficiency': 0.75, 'quality': 0.80, 'energy_consumption': 0.25}
+        return lambda: optimizer.optimize_operation_parameters(performance)
+    if case.startswith('anomaly'):
+        system = AnomalyDetectionSystem()
+        if case == 'anomaly_train':
+            return lambda: system.train_anomaly_detection(samples)
+        system.train_anomaly_detection(samples)
+        return lambda: system.detect_anomalies(samples[0])
+    raise ValueError(f"Bilinmeyen araştırma durumu: {case}")
+
+def build_case(name: str, seed: int, threads: int, stack: ExitStack) -> Callable:
+    """Modeli rastgele ağırlıklarla kurar ve tek ölçüm çağrısını döndürür"""
+    if name.startswith('research.'):
+        return build_research_case(name.split('.', 1)[1], seed)
+    
+    import cv2
+    from advanced_detection import ANALYZERS, IntegratedAnalysisEngine
+    from defect_detection import DefectDetectionModel, ImageContext, analyze_context
+    
+    group, resolution = name.split('@')
+    image = synthetic_uv_image(*parse_resolution(resolution), seed=seed)
+    
+    # Her çağrıda yeni bağlam: çözme/ön işleme önbelleği ölçümü kısaltmaz
+    if group in ANALYZERS:
+        analyzer = ANALYZERS[group][0](**RANDOM_WEIGHTS.get(group, {}))
+        analyze = getattr(analyzer, ANALYZERS[group][1])
+        return lambda: analyze(ImageContext(image=image))
+    if group == 'engine':
+        budgets = {model: threads for model in RANDOM_WEIGHTS}
+        engine = IntegratedAnalysisEngine(thread_budgets=budgets, analyzer_options=RANDOM_WEIGHTS)
+        stack.callback(engine.close)
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        image_path = os.path.join(directory, 'benchmark.png')
+        cv2.imwrite(image_path, image)
+        return lambda: engine.comprehensive_analysis(image_path)
+    if group == 'defect':
+        detector = DefectDetectionModel()
+        return lambda: analyze_context(detector, ImageContext(image=image))
+    raise ValueError(f"Bilinmeyen benchmark grubu: {group}")
+
+def child(name: str, repeats: int, warmup: int, threads: int, seed: int):
+    """Tek durumu yeni süreçte ölçer; tepe RSS yalnızca bu durumu yansıtır"""
+    import torch
+    from instrumentation import peak_rss_bytes
+    
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    set_threads(threads, tensorflow=name.startswith('defect@'))
+    if name.startswith('defect@'):
+        import tensorflow as tf
+        tf.random.set_seed(seed)
+    
+    with ExitStack() as stack:
+        start = time.perf_counter()
+        call = build_case(name, seed, threads, stack)
+        setup_s = time.perf_counter() - start
+        samples = time_calls(call, repeats, warmup)
+    
+    summary = latency_summary(samples)
+    print(json.dumps({
+        **summary,
+        'throughput_per_s': 1000 / summary['mean_ms'],
+        'setup_s': setup_s,
+        'peak_rss_mb': peak_rss_bytes() / MB
+    }))
+
+def child_error(stderr: str, returncode: int) -> str:
+    """Alt süreç çıktısından istisna satırını bulur (ardından gelen kütüphane günlükleri atlanır)"""
+    if returncode < 0:
+        return f"signal {-returncode}"
+    lines = stderr.splitlines()
+    marker = 'Traceback (most recent call last):'
+    if marker in lines:
+        start = len(lines) - lines[::-1].index(marker)
+        for line in lines[start:]:
+            if line and not line[0].isspace():
+                return line
+    return f"exit code {returncode}"
+
+def run_case(name: str, args) -> Dict:
+    """Durumu ayrı Python sürecinde çalıştırır; hata mesajı sonuca yazılır"""
+    env = {
+        **os.environ,
+        'OMP_NUM_THREADS': str(args.threads),
+        'MKL_NUM_THREADS': str(args.threads),
+        # Model indirme denemesi sessizce ağa çıkmak yerine hata verir
+        'HF_HUB_OFFLINE': '1',
+        'TRANSFORMERS_OFFLINE': '1'
+    }
+    env.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    command = [sys.executable, os.path.abspath(__file__), '--child', name,
+               '--repeats', str(args.repeats), '--warmup', str(args.warmup),
+               '--threads', str(args.threads), '--seed', str(args.seed)]
+    
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, env=env, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f"zaman aşımı ({args.timeout} s)"}
+    if process.returncode != 0:
+        return {'error': child_error(process.stderr, process.returncode)}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+def environment(args) -> Dict:
+    """Sonuçları yorumlamak için makine, sürüm ve ayar bilgisi"""
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    
+    return {
+        'created': datetime.now().isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+        'threads': args.threads,
+        'repeats': args.repeats,
+        'warmup': args.warmup,
+        'seed': args.seed
+    }
+
+def compare(results: Dict, baseline: Dict, thresholds: Dict[str, float], min_delta_ms: float) -> List[Dict]:
+    """Taban çizgisinde başarılı olan her durum için metrik değişimlerini hesaplar
+    
+    Göreli kötüleşme eşiği aşınca gerileme sayılır; gecikme farkı `min_delta_ms` altında
+    kalan çok kısa durumlar zamanlayıcı gürültüsü nedeniyle işaretlenmez. Taban çizgisinde
+    çalışıp şimdi hata veren durum da gerilemedir.
+    """
+    rows = []
+    for name, base in baseline['cases'].items():
+        current = results['cases'].get(name)
+        if current is None or 'error' in base:
+            continue
+        if 'error' in current:
+            rows.append({'case': name, 'metric': 'error', 'baseline': None, 'current': current['error'],
+                         'change': None, 'regression': True})
+            continue
+        
+        for metric, higher_is_better in METRICS.items():
+            before, after = base[metric], current[metric]
+            change = (after - before) / before if before else 0.0
+            worse = -change if higher_is_better else change
+            regression = worse > thresholds[metric]
+            if metric != 'peak_rss_mb':
+                # Verim ortalama gecikmenin tersi; fark ortalama gecikme üzerinden ölçülür
+                delta_ms = (abs(1000 / after - 1000 / before) if higher_is_better
+                            else abs(after - before))
+                regression = regression and delta_ms >= min_delta_ms
+            rows.append({'case': name, 'metric': metric, 'baseline': before, 'current': after,
+                         'change': change, 'regression': regression})
+    return rows
+
+def environment_changes(results: Dict, baseline: Dict) -> List[str]:
+    """Taban çizgisinden bu yana değişen makine/sürüm/ayar alanları"""
+    changes = []
+    for key in ('machine', 'cpu_count', 'threads', 'python'):
+        if results['meta'].get(key) != baseline['meta'].get(key):
+            changes.append(f"{key}: {baseline['meta'].get(key)} -> {results['meta'].get(key)}")
+    before = baseline['meta'].get('packages', {})
+    for package, version in results['meta']['packages'].items():
+        if before.get(package) != version:
+            changes.append(f"{package}: {before.get(package)} -> {version}")
+    return changes
+
+def print_results(results: Dict):
+    print(f"{'case':<28}{'p50 ms':>10}{'p99 ms':>10}{'per s':>10}{'RSS MB':>10}")
+    for name, case in results['cases'].items():
+        if 'error' in case:
+            print(f"{name:<28}  error: {case['error']}")
+        else:
+            print(f"{name:<28}{case['p50_ms']:>10.1f}{case['p99_ms']:>10.1f}"
+                  f"{case['throughput_per_s']:>10.2f}{case['peak_rss_mb']:>10.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark suite with baseline regression checks')
+    parser.add_argument('--groups', type=str, default=','.join(GROUPS),
+                        help='Comma-separated groups (default: ' + ','.join(GROUPS) + ')')
+    parser.add_argument('--resolutions', type=str, default=DEFAULT_RESOLUTIONS,
+                        help='Comma-separated HxW synthetic image sizes')
+    parser.add_argument('--repeats', type=int, default=10, help='Measured calls per case')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured warm-up calls per case')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='Fixed thread count for torch/cv2/TensorFlow (1 is the most reproducible)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for images, sensor data and weights')
+    parser.add_argument('--timeout', type=float, default=1800, help='Per-case timeout in seconds')
+    parser.add_argument('--output', type=str, default='benchmark_results.json', help='Results JSON path')
+    parser.add_argument('--baseline', type=str, help='Baseline results JSON to compare against')
+    parser.add_argument('--save-baseline', type=str, help='Also write the results as a new baseline')
+    parser.add_argument('--latency-threshold', type=float, default=0.15,
+                        help='Allowed relative p50 latency increase')
+    parser.add_argument('--tail-threshold', type=float, default=0.30,
+                        help='Allowed relative p99 latency increase')
+    parser.add_argument('--throughput-threshold', type=float, default=0.15,
+                        help='Allowed relative throughput decrease')
+    parser.add_argument('--rss-threshold', type=float, default=0.10,
+                        help='Allowed relative peak RSS increase')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Latency changes smaller than this are never regressions')
+    parser.add_argument('--child', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        return child(args.child, args.repeats, args.warmup, args.threads, args.seed)
+    
+    groups = args.groups.split(',')
+    unknown = [group for group in groups if group not in GROUPS]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)}")
+    resolutions = [parse_resolution(text) for text in args.resolutions.split(',')]
+    
+    # Taban çizgisi ölçümden önce okunur; eksik dosya uzun bir koşudan sonra fark edilmez
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot read baseline {args.baseline}: {e}")
+    elif not args.save_baseline:
+        logger.warning("No --baseline given: results are saved but not checked for regressions")
+    
+    results = {'meta': environment(args), 'cases': {}}
+    results['meta']['resolutions'] = [f"{height}x{width}" for height, width in resolutions]
+    for name in case_names(groups, resolutions):
+        logger.info(f"Benchmark: {name}")
+        results['cases'][name] = run_case(name, args)
+        if 'error' in results['cases'][name]:
+            logger.error(f"{name} başarısız: {results['cases'][name]['error']}")
+    
+    print_results(results)
+    
+    failed = False
+    if baseline is not None:
+        for change in environment_changes(results, baseline):
+            logger.warning(f"Ortam taban çizgisinden farklı: {change}")
+        thresholds = {'p50_ms': args.latency_threshold, 'p99_ms': args.tail_threshold,
+                      'throughput_per_s': args.throughput_threshold, 'peak_rss_mb': args.rss_threshold}
+        rows = compare(results, baseline, thresholds, args.min_delta_ms)
+        regressions = [row for row in rows if row['regression']]
+        results['comparison'] = {'baseline': args.baseline, 'thresholds': thresholds,
+                                 'min_delta_ms': args.min_delta_ms, 'rows': rows,
+                                 'regressions': len(regressions)}
+        for row in regressions:
+            if row['metric'] == 'error':
+                logger.error(f"REGRESSION {row['case']}: hata ({row['current']})")
+            else:
+                logger.error(f"REGRESSION {row['case']} {row['metric']}: {row['baseline']:.2f} -> "
+                             f"{row['current']:.2f} ({row['change']:+.1%})")
+        logger.info(f"{len(rows)} metrics compared against {args.baseline}, {len(regressions)} regressions")
+        if not rows:
+            logger.error(f"Taban çizgisiyle karşılaştırılabilir durum yok ({args.baseline}); "
+                         f"grup ve çözünürlükler eşleşmeli")
+        failed = bool(regressions) or not rows
+    
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Benchmark results saved to: {path}")
+    
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
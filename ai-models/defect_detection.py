@@ -9,35 +9,181 @@ import numpy as np
 import cv2
 import json
 import argparse
+import hashlib
 import logging
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Any, Callable, List, Dict, Tuple, Iterable, Iterator, Union
 import os
 
+from instrumentation import INSTRUMENTATION, stage
+from result_cache import ResultCache, file_digest, make_key, model_fingerprint
+
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Ölçüm kaydındaki motor etiketleri: tek görüntü istekleri ve toplu analiz
+ENGINE_NAME = 'defect_detection'
+BATCH_ENGINE_NAME = 'defect_detection_batch'
+
+# Yalnızca eğitimde etkili olan veri artırma katmanları
+AUGMENTATION_LAYERS = (
+    tf.keras.layers.RandomFlip,
+    tf.keras.layers.RandomRotation,
+    tf.keras.layers.RandomZoom,
+)
+
+class ImageContext:
+    """Görüntüyü bir kez çözer, türetilmiş görünümleri ilk kullanımda önbelleğe alır
+    
+    Görünümler iş parçacığı güvenlidir: aynı görünüm eşzamanlı isteklerde bir kez üretilir,
+    farklı görünümler (ör. ResNet ve ViT girdileri) birbirini beklemez.
+    """
+    
+    def __init__(self, image_path: str = None, image: np.ndarray = None):
+        if image_path is None and image is None:
+            raise ValueError("image_path veya image belirtilmeli")
+        self.image_path = image_path
+        self._bgr = image
+        self._shape = image.shape if image is not None else None
+        self._views = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+    
+    def _decode(self) -> np.ndarray:
+        image = cv2.imread(self.image_path)
+        if image is None:
+            raise ValueError(f"Görüntü yüklenemedi: {self.image_path}")
+        self._bgr = image
+        self._shape = image.shape
+        return image
+    
+    @property
+    def bgr(self) -> np.ndarray:
+        """Orijinal çözünürlükte BGR görüntü"""
+        if self._bgr is None:
+            return self._decode()
+        return self._bgr
+    
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Orijinal görüntü boyutu (yükseklik, genişlik, kanal)"""
+        if self._shape is None:
+            self._decode()
+        return self._shape
+    
+    @property
+    def rgb(self) -> np.ndarray:
+        return self.view('rgb', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+    
+    @property
+    def gray(self) -> np.ndarray:
+        return self.view('gray', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+    
+    def resized(self, size: Tuple[int, int]) -> np.ndarray:
+        """(genişlik, yükseklik) boyutuna bilinear (cv2.INTER_LINEAR) ölçeklenmiş RGB görüntü"""
+        return self.view(('resized', size), lambda: cv2.resize(self.rgb, size, interpolation=cv2.INTER_LINEAR))
+    
+    def normalized(self, size: Tuple[int, int]) -> np.ndarray:
+        """[0, 1] aralığına normalize edilmiş, ölçeklenmiş RGB görüntü"""
+        return self.view(('normalized', size), lambda: self.resized(size).astype(np.float32) / 255.0)
+    
+    def view(self, key, factory: Callable[[], Any]):
+        """Anahtarla önbelleğe alınan türetilmiş görünüm (ör. model girdisi tensörleri)"""
+        value = self._views.get(key)
+        if value is not None:
+            return value
+        # Kilit görünüm başınadır; yalnızca aynı görünümü isteyenler bekler
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            value = self._views.get(key)
+            if value is None:
+                value = self._views[key] = factory()
+        return value
+    
+    def release(self):
+        """Tam çözünürlüklü görünümleri bırakır; boyut ve ölçeklenmiş görünümler kalır"""
+        self._bgr = None
+        for key in ('rgb', 'gray'):
+            self._views.pop(key, None)
+
+ImageInput = Union[str, ImageContext]
+
 class DefectDetectionModel:
     """UV görüntülerinde hata tespit eden CNN modeli"""
     
-    def __init__(self, model_path: str = None, input_shape: Tuple[int, int, int] = (512, 512, 3)):
+    def __init__(self, model_path: str = None, input_shape: Tuple[int, int, int] = (512, 512, 3),
+                 xla: bool = False, warmup: bool = True):
         self.input_shape = input_shape
         self.class_names = ['crack', 'porosity', 'inclusion', 'no_defect']
         self.model = None
+        self.model_path = None
+        self.inference_model = None
+        self.backend = 'keras'
+        self.xla = xla
+        self.last_timing = {}
+        self._infer = None
+        self._cam_fns = None
+        self._fingerprint = None
         
         if model_path and os.path.exists(model_path):
             self.load_model(model_path)
         else:
             self.model = self.build_model()
+            self._prepare_inference()
+        
+        if warmup:
+            self.warmup()
+    
+    def warmup(self):
+        """Boş bir görüntüyle çıkarım yaparak grafiği önceden hazırlar"""
+        dummy = np.zeros((1, *self.input_shape), dtype=np.float32)
+        self.predict_batch(dummy)
+        if self.backend == 'keras':
+            self.predict_batch_with_cam(dummy)
+        logger.info("Model ısındırıldı")
+    
+    def _inference_layers(self) -> List[tf.keras.layers.Layer]:
+        """Eğitim modelinin veri artırma dışındaki katmanları"""
+        return [layer for layer in self.model.layers if not isinstance(layer, AUGMENTATION_LAYERS)]
+    
+    def build_inference_model(self) -> tf.keras.Model:
+        """Eğitim modeliyle ağırlık paylaşan, veri artırma ve derleme durumu içermeyen model"""
+        inputs = tf.keras.Input(shape=self.input_shape, name='images')
+        x = inputs
+        for layer in self._inference_layers():
+            x = layer(x, training=False)
+        return tf.keras.Model(inputs, x, name='defect_inference')
+    
+    def _prepare_inference(self):
+        """Sabit girdi imzalı (isteğe bağlı XLA) çıkarım fonksiyonunu hazırlar"""
+        self._cam_fns = None
+        if self.backend != 'keras':
+            self.inference_model = None
+            self._infer = None
+            return
+        
+        self.inference_model = self.build_inference_model()
+        self._infer = tf.function(
+            lambda images: self.inference_model(images, training=False),
+            input_signature=[tf.TensorSpec([None, *self.input_shape], tf.float32)],
+            jit_compile=self.xla
+        )
     
     def build_model(self) -> tf.keras.Model:
         """CNN model architecture oluşturur"""
         model = tf.keras.Sequential([
             # Veri artırma katmanları
-            tf.keras.layers.experimental.preprocessing.RandomFlip("horizontal"),
-            tf.keras.layers.experimental.preprocessing.RandomRotation(0.1),
-            tf.keras.layers.experimental.preprocessing.RandomZoom(0.1),
+            tf.keras.layers.RandomFlip("horizontal"),
+            tf.keras.layers.RandomRotation(0.1),
+            tf.keras.layers.RandomZoom(0.1),
             
             # Konvolüsyonel bloklar
             tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=self.input_shape),
@@ -69,43 +215,50 @@ class DefectDetectionModel:
             tf.keras.layers.Dense(len(self.class_names), activation='softmax')
         ])
         
-        # Model compilation
+        # Ağırlıkları oluştur; çıkarım modeli aynı katmanları paylaşır
+        model.build((None, *self.input_shape))
+        
+        self.compile_model(model)
+        
+        return model
+    
+    @staticmethod
+    def compile_model(model: tf.keras.Model):
+        """Modeli eğitim için optimizer, kayıp ve metriklerle derler"""
         model.compile(
             optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
             loss='categorical_crossentropy',
-            metrics=['accuracy', 'precision', 'recall']
+            metrics=['accuracy', tf.keras.metrics.Precision(name='precision'),
+                     tf.keras.metrics.Recall(name='recall')]
         )
-        
-        return model
     
-    def preprocess_image(self, image_path: str) -> np.ndarray:
+    @staticmethod
+    def image_context(image: ImageInput) -> ImageContext:
+        """Görüntü yolunu veya mevcut bağlamı ImageContext olarak döndürür"""
+        if isinstance(image, ImageContext):
+            return image
+        return ImageContext(image)
+    
+    def preprocess_image(self, image: ImageInput) -> np.ndarray:
         """Görüntüyü model için ön işler"""
         try:
-            # Görüntüyü yükle
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ValueError(f"Görüntü yüklenemedi: {image_path}")
+            context = self.image_context(image)
             
-            # BGR'dan RGB'ye dönüştür
-            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Boyutu yeniden boyutlandır
-            image = cv2.resize(image, (self.input_shape[1], self.input_shape[0]))
-            
-            # Normalize et [0, 1] aralığına
-            image = image.astype(np.float32) / 255.0
+            # RGB, yeniden boyutlandırılmış ve [0, 1] aralığına normalize edilmiş görüntü
+            processed = context.normalized((self.input_shape[1], self.input_shape[0]))
             
             # Batch dimension ekle
-            image = np.expand_dims(image, axis=0)
-            
-            return image
-            
+            return np.expand_dims(processed, axis=0)
+        
         except Exception as e:
             logger.error(f"Görüntü ön işleme hatası: {e}")
             raise
     
-    def enhance_uv_image(self, image: np.ndarray) -> np.ndarray:
+    def enhance_uv_image(self, image: Union[np.ndarray, ImageContext]) -> np.ndarray:
         """UV görüntüsünü geliştirir"""
+        if isinstance(image, ImageContext):
+            image = image.rgb
+        
         # Kontrast artırma
         lab = cv2.cvtColor(image, cv2.COLOR_RGB2LAB)
         lab[:, :, 0] = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(lab[:, :, 0])
@@ -116,51 +269,332 @@ class DefectDetectionModel:
         
         return enhanced
     
-    def predict_defects(self, image_path: str, confidence_threshold: float = 0.3) -> List[Dict]:
+    def predict_defects(self, image: ImageInput, confidence_threshold: float = 0.3,
+                        return_heatmaps: bool = False) -> List[Dict]:
         """Görüntüden hataları tespit eder"""
         try:
-            # Görüntüyü ön işle
-            processed_image = self.preprocess_image(image_path)
-            
-            # Tahmin yap
-            predictions = self.model.predict(processed_image, verbose=0)
-            confidences = predictions[0]
-            
-            # Sonuçları işle
-            results = []
-            for i, class_name in enumerate(self.class_names):
-                confidence = float(confidences[i])
-                
-                if confidence > confidence_threshold:
-                    # Hata konumunu tespit et (basit yöntem)
-                    location = self.localize_defect(image_path, class_name, confidence)
-                    
-                    result = {
-                        'defect_type': class_name,
-                        'confidence': confidence,
-                        'location': location,
-                        'severity': self.determine_severity(class_name, confidence)
-                    }
-                    results.append(result)
-            
-            return results
-            
+            return self.detections_from_raw(self.predict_raw(image), confidence_threshold, return_heatmaps)
+        
         except Exception as e:
             logger.error(f"Hata tespit hatası: {e}")
             raise
     
-    def localize_defect(self, image_path: str, defect_type: str, confidence: float) -> Dict:
-        """Hata lokalizasyonu (basit implementasyon)"""
-        # Gerçek implementasyonda Grad-CAM veya benzer teknikler kullanılabilir
-        image = cv2.imread(image_path)
-        h, w = image.shape[:2]
+    def predict_raw(self, image: ImageInput) -> Dict:
+        """Tüm görüntü için eşikten bağımsız ham çıktıları hesaplar"""
+        context = self.image_context(image)
+        
+        # Görüntüyü ön işle
+        with stage('preprocess'):
+            processed_image = self.preprocess_image(context)
+        
+        # Tahmin ve sınıf aktivasyon haritaları tek ileri geçişten
+        with stage('inference'):
+            predictions, cams = self.predict_batch_with_cam(processed_image)
+        
+        return self.raw_predictions(context.shape, predictions, cams)
+    
+    def predict_batch(self, images: np.ndarray) -> np.ndarray:
+        """Ön işlenmiş görüntü yığını için sınıf olasılıklarını döndürür"""
+        images = np.ascontiguousarray(images, dtype=np.float32)
+        
+        if self.backend == 'tflite':
+            input_index = self.model.get_input_details()[0]['index']
+            if tuple(self.model.get_input_details()[0]['shape']) != images.shape:
+                self.model.resize_tensor_input(input_index, images.shape)
+                self.model.allocate_tensors()
+            self.model.set_tensor(input_index, images)
+            self.model.invoke()
+            return self.model.get_tensor(self.model.get_output_details()[0]['index'])
+        
+        if self.backend == 'onnx':
+            input_name = self.model.get_inputs()[0].name
+            return self.model.run(None, {input_name: images})[0]
+        
+        return self._infer(images).numpy()
+    
+    def _cam_functions(self):
+        """İleri geçiş ve Grad-CAM için izlenmiş (traced) fonksiyonları bir kez oluşturur"""
+        if self._cam_fns is not None:
+            return self._cam_fns
+        
+        # Son evrişim çıktısı ile GlobalAveragePooling sonrası başı ayır
+        layers = self._inference_layers()
+        pooling_index = next((i for i, layer in enumerate(layers)
+                              if isinstance(layer, tf.keras.layers.GlobalAveragePooling2D)), None)
+        if pooling_index is None:
+            return None
+        feature_layers = layers[:pooling_index]
+        pooling_layer = layers[pooling_index]
+        head_layers = layers[pooling_index + 1:]
+        
+        def head(pooled):
+            for layer in head_layers:
+                pooled = layer(pooled, training=False)
+            return pooled
         
-        # Mock lokalizasyon (rastgele pozisyon)
-        x = np.random.randint(0, w // 2)
-        y = np.random.randint(0, h // 2)
-        width = np.random.randint(20, min(100, w - x))
-        height = np.random.randint(10, min(50, h - y))
+        @tf.function(input_signature=[tf.TensorSpec([None, *self.input_shape], tf.float32)],
+                     jit_compile=self.xla)
+        def forward(images):
+            features = images
+            for layer in feature_layers:
+                features = layer(features, training=False)
+            pooled = pooling_layer(features)
+            return features, pooled, head(pooled)
+        
+        # Sabit imza: karo sayısı (yığın boyutu) değişince yeniden izleme yapılmaz
+        features_spec, pooled_spec, _ = forward.get_concrete_function().structured_outputs
+        
+        @tf.function(input_signature=[tf.TensorSpec([None, *features_spec.shape[1:]], tf.float32),
+                                      tf.TensorSpec([None, *pooled_spec.shape[1:]], tf.float32)])
+        def class_activation_maps(features, pooled):
+            # Yalnızca yoğun baş üzerinden, tüm sınıflar için tek jacobian
+            with tf.GradientTape() as tape:
+                tape.watch(pooled)
+                predictions = head(pooled)
+            weights = tape.batch_jacobian(predictions, pooled)
+            return tf.nn.relu(tf.einsum('bhwc,bkc->bkhw', features, weights))
+        
+        self._cam_fns = (forward, class_activation_maps)
+        return self._cam_fns
+    
+    def predict_batch_with_cam(self, images: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sınıf olasılıklarını ve tüm sınıflar için Grad-CAM haritalarını döndürür
+        
+        Haritalar aynı ileri geçişin son evrişim aktivasyonlarından hesaplanır.
+        GlobalAveragePooling nedeniyle Grad-CAM ağırlıkları havuzlanmış vektöre göre
+        gradyanla orantılıdır; bu yüzden tüm sınıfların gradyanı evrişim katmanlarına
+        geri yayılmadan, yalnızca yoğun baş üzerinden tek bir batch_jacobian ile elde edilir.
+        """
+        # Grad-CAM gradyan gerektirir; TFLite/ONNX çalışma zamanlarında yalnızca tahmin yapılır
+        cam_functions = self._cam_functions() if self.backend == 'keras' else None
+        if cam_functions is None:
+            if self.backend == 'keras':
+                logger.warning("Model GlobalAveragePooling içermiyor, Grad-CAM atlanıyor")
+            self.last_timing = {}
+            return self.predict_batch(images), None
+        forward, class_activation_maps = cam_functions
+        
+        start = time.perf_counter()
+        features, pooled, predictions = forward(tf.convert_to_tensor(images, dtype=tf.float32))
+        predictions = predictions.numpy()
+        inference_time = time.perf_counter() - start
+        
+        # (batch, sınıf, h, w) haritalar
+        cams = class_activation_maps(features, pooled).numpy()
+        localization_time = time.perf_counter() - start - inference_time
+        
+        self.last_timing = {
+            'inference_ms': inference_time * 1000,
+            'localization_ms': localization_time * 1000,
+            'localization_overhead_pct': localization_time / inference_time * 100 if inference_time > 0 else 0.0
+        }
+        
+        return predictions, cams
+    
+    def build_detections(self, image: ImageInput, confidences: np.ndarray,
+                         confidence_threshold: float = 0.3, cams: np.ndarray = None,
+                         return_heatmaps: bool = False) -> List[Dict]:
+        """Sınıf olasılıklarından tespit listesini oluşturur"""
+        context = self.image_context(image)
+        raw = self.raw_predictions(context.shape, confidences[None],
+                                   cams[None] if cams is not None else None)
+        return self.detections_from_raw(raw, confidence_threshold, return_heatmaps)
+    
+    def raw_predictions(self, image_shape: Tuple[int, ...], predictions: np.ndarray, cams: np.ndarray = None,
+                        tiles: List[Tuple[int, int, int, int]] = None) -> Dict:
+        """Eşikten bağımsız, JSON'a çevrilebilir ham çıktılar
         
+        Her karo (karosuz modda tüm görüntü) için sınıf olasılıkları ve görüntü
+        koordinatlarında sınıf başına Grad-CAM kutusu, ayrıca her sınıfın en belirleyici
+        karosunun küçük ısı haritası tutulur. Eşik değişikliği yeniden çıkarım gerektirmez.
+        """
+        h, w = image_shape[:2]
+        tiled = tiles is not None
+        tiles = tiles if tiled else [(0, 0, w, h)]
+        
+        boxes = []
+        for t, (x, y, tw, th) in enumerate(tiles):
+            tile_boxes = []
+            for i in range(len(self.class_names)):
+                # Hata konumunu sınıf aktivasyon haritasından çıkar
+                box = (self.cam_to_box(cams[t][i], (th, tw)) if cams is not None
+                       else self._full_image_box((th, tw)))
+                tile_boxes.append([x + box['x'], y + box['y'], box['width'], box['height']])
+            boxes.append(tile_boxes)
+        
+        heatmaps = None
+        if cams is not None and len(tiles):
+            heatmaps = [self.compact_heatmap(cams[self._best_tile(predictions[:, i], class_name)][i])
+                        for i, class_name in enumerate(self.class_names)]
+        
+        return {
+            'shape': [int(h), int(w)],
+            'tiled': tiled,
+            'tiles': [[int(v) for v in tile] for tile in tiles],
+            'predictions': np.asarray(predictions, dtype=float).tolist(),
+            'boxes': boxes,
+            'heatmaps': heatmaps
+        }
+    
+    @staticmethod
+    def _best_tile(scores: np.ndarray, class_name: str) -> int:
+        """Hata sınıflarında en güvenli, 'no_defect' için en az güvenli karo"""
+        return int(np.argmin(scores) if class_name == 'no_defect' else np.argmax(scores))
+    
+    def detections_from_raw(self, raw: Dict, confidence_threshold: float = 0.3,
+                            return_heatmaps: bool = False) -> List[Dict]:
+        """Ham çıktılara eşik uygulayarak tespit listesini oluşturur"""
+        if not raw['tiles']:
+            return []
+        
+        predictions = np.asarray(raw['predictions'])
+        results = []
+        for i, class_name in enumerate(self.class_names):
+            scores = predictions[:, i]
+            best = self._best_tile(scores, class_name)
+            confidence = float(scores[best])
+            if confidence <= confidence_threshold:
+                continue
+            
+            result = {
+                'defect_type': class_name,
+                'confidence': confidence,
+                'location': self._box_dict(*raw['boxes'][best][i])
+            }
+            if raw['tiled']:
+                hits = np.flatnonzero(scores > confidence_threshold) if class_name != 'no_defect' else [best]
+                result['regions'] = [self._box_dict(*box) for box in
+                                     self._merge_boxes([tuple(raw['boxes'][t][i]) for t in hits])]
+            result['severity'] = self.determine_severity(class_name, confidence)
+            if return_heatmaps and raw['heatmaps'] is not None:
+                result['heatmap'] = raw['heatmaps'][i]
+            results.append(result)
+        
+        return results
+    
+    @staticmethod
+    def _tile_positions(length: int, tile: int, stride: int) -> List[int]:
+        """Kenarı da kapsayacak şekilde bir eksen boyunca karo başlangıçları"""
+        positions = list(range(0, max(length - tile, 0) + 1, stride))
+        if positions[-1] + tile < length:
+            positions.append(length - tile)
+        return positions
+    
+    def plan_tiles(self, image: ImageInput, tile_size: Tuple[int, int] = None, overlap: float = 0.25,
+                   min_tile_mean: float = 10.0, min_tile_std: float = 4.0,
+                   stat_scale: int = 8) -> Tuple[List[Tuple[int, int, int, int]], int]:
+        """Örtüşen karoları çıkarır, boş veya karanlık karoları ucuz bir istatistikle eler
+        
+        Her karonun gri ortalama ve standart sapması, `stat_scale` kat küçültülmüş gri
+        görüntünün integral görüntülerinden O(1) maliyetle hesaplanır.
+        Dönüş: (x, y, genişlik, yükseklik) karoları ve elenen karo sayısı.
+        """
+        context = self.image_context(image)
+        h, w = context.shape[:2]
+        tile_h, tile_w = tile_size or self.input_shape[:2]
+        tile_h, tile_w = min(tile_h, h), min(tile_w, w)
+        
+        tiles = [(x, y, tile_w, tile_h)
+                 for y in self._tile_positions(h, tile_h, max(1, int(tile_h * (1 - overlap))))
+                 for x in self._tile_positions(w, tile_w, max(1, int(tile_w * (1 - overlap))))]
+        
+        small = cv2.resize(context.gray, (max(1, w // stat_scale), max(1, h // stat_scale)),
+                           interpolation=cv2.INTER_AREA)
+        integral, integral_sq = cv2.integral2(small, sdepth=cv2.CV_64F)
+        sy, sx = small.shape[0] / h, small.shape[1] / w
+        
+        kept = []
+        for x, y, tw, th in tiles:
+            x0, y0 = int(x * sx), int(y * sy)
+            x1, y1 = max(x0 + 1, int((x + tw) * sx)), max(y0 + 1, int((y + th) * sy))
+            n = (x1 - x0) * (y1 - y0)
+            total = integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
+            total_sq = integral_sq[y1, x1] - integral_sq[y0, x1] - integral_sq[y1, x0] + integral_sq[y0, x0]
+            mean = total / n
+            std = np.sqrt(max(total_sq / n - mean ** 2, 0.0))
+            if mean >= min_tile_mean and std >= min_tile_std:
+                kept.append((x, y, tw, th))
+        
+        return kept, len(tiles) - len(kept)
+    
+    def predict_defects_tiled(self, image: ImageInput, confidence_threshold: float = 0.3,
+                              tile_size: Tuple[int, int] = None, overlap: float = 0.25,
+                              batch_size: int = 16, return_heatmaps: bool = False,
+                              min_tile_mean: float = 10.0, min_tile_std: float = 4.0) -> List[Dict]:
+        """Büyük görüntüleri doğal çözünürlükte örtüşen karolarla analiz eder
+        
+        Karolar yığınlar halinde tek çağrıda işlenir. Sonuçlar sınıf başına birleştirilir:
+        hata sınıflarında en yüksek karo güveni, 'no_defect' için en düşük karo güveni
+        (görüntü ancak tüm karolar temizse temizdir) kullanılır. Konum en güvenli karonun
+        Grad-CAM kutusudur; eşiği geçen tüm karoların örtüşen kutuları `regions` altında
+        görüntü koordinatlarında birleştirilir.
+        """
+        try:
+            raw = self.predict_raw_tiled(image, tile_size, overlap, batch_size, min_tile_mean, min_tile_std)
+            return self.detections_from_raw(raw, confidence_threshold, return_heatmaps)
+        
+        except Exception as e:
+            logger.error(f"Karo tabanlı hata tespit hatası: {e}")
+            raise
+    
+    def predict_raw_tiled(self, image: ImageInput, tile_size: Tuple[int, int] = None, overlap: float = 0.25,
+                          batch_size: int = 16, min_tile_mean: float = 10.0,
+                          min_tile_std: float = 4.0) -> Dict:
+        """Karo modunda eşikten bağımsız ham çıktıları hesaplar"""
+        context = self.image_context(image)
+        with stage('tile_planning'):
+            tiles, skipped = self.plan_tiles(context, tile_size, overlap, min_tile_mean, min_tile_std)
+        timing = {'inference_ms': 0.0, 'localization_ms': 0.0,
+                  'tiles_inferred': len(tiles), 'tiles_skipped': skipped}
+        
+        if not tiles:
+            self.last_timing = timing
+            return self.raw_predictions(context.shape, np.zeros((0, len(self.class_names))), None, tiles)
+        
+        size = (self.input_shape[1], self.input_shape[0])
+        predictions, cams = [], []
+        for start in range(0, len(tiles), batch_size):
+            with stage('preprocess'):
+                batch = np.stack([
+                    cv2.resize(context.rgb[y:y + th, x:x + tw], size) if (tw, th) != size
+                    else context.rgb[y:y + th, x:x + tw]
+                    for x, y, tw, th in tiles[start:start + batch_size]
+                ]).astype(np.float32) / 255.0
+            with stage('inference'):
+                batch_predictions, batch_cams = self.predict_batch_with_cam(batch)
+            predictions.append(batch_predictions)
+            cams.append(batch_cams)
+            timing['inference_ms'] += self.last_timing.get('inference_ms', 0.0)
+            timing['localization_ms'] += self.last_timing.get('localization_ms', 0.0)
+        predictions = np.concatenate(predictions)
+        cams = np.concatenate(cams) if cams[0] is not None else None
+        self.last_timing = timing
+        
+        return self.raw_predictions(context.shape, predictions, cams, tiles)
+    
+    @staticmethod
+    def _merge_boxes(boxes: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int, int, int]]:
+        """Örtüşen (x, y, genişlik, yükseklik) kutularını birleşimleriyle değiştirir"""
+        merged = [list(box) for box in boxes]
+        changed = True
+        while changed:
+            changed = False
+            for i in range(len(merged)):
+                for j in range(i + 1, len(merged)):
+                    ax, ay, aw, ah = merged[i]
+                    bx, by, bw, bh = merged[j]
+                    if ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah:
+                        x0, y0 = min(ax, bx), min(ay, by)
+                        merged[i] = [x0, y0, max(ax + aw, bx + bw) - x0, max(ay + ah, by + bh) - y0]
+                        del merged[j]
+                        changed = True
+                        break
+                if changed:
+                    break
+        return [tuple(box) for box in merged]
+    
+    @staticmethod
+    def _box_dict(x: int, y: int, width: int, height: int) -> Dict:
         return {
             'x': int(x),
             'y': int(y),
@@ -170,6 +604,54 @@ class DefectDetectionModel:
             'center_y': int(y + height // 2)
         }
     
+    def cam_to_box(self, cam: np.ndarray, image_shape: Tuple[int, ...], threshold: float = 0.5) -> Dict:
+        """Aktivasyon haritasının tepe bölgesini orijinal görüntü koordinatlarında kutuya çevirir"""
+        h, w = image_shape[:2]
+        peak = float(cam.max())
+        
+        # Aktivasyon yoksa tüm görüntü
+        if peak <= 0:
+            return self._full_image_box(image_shape)
+        
+        # Tepe noktasını içeren bağlı bölge
+        mask = (cam >= peak * threshold).astype(np.uint8)
+        _, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        peak_y, peak_x = np.unravel_index(np.argmax(cam), cam.shape)
+        cx, cy, cw, ch = stats[labels[peak_y, peak_x], :4]
+        
+        scale_x = w / cam.shape[1]
+        scale_y = h / cam.shape[0]
+        x = int(cx * scale_x)
+        y = int(cy * scale_y)
+        width = min(int(np.ceil(cw * scale_x)), w - x)
+        height = min(int(np.ceil(ch * scale_y)), h - y)
+        
+        return self._box_dict(x, y, width, height)
+    
+    def compact_heatmap(self, cam: np.ndarray, size: int = 16) -> List[List[int]]:
+        """Aktivasyon haritasını JSON için küçük, 0-255 aralığında bir ızgaraya indirger"""
+        peak = float(cam.max())
+        if peak <= 0:
+            return np.zeros((size, size), dtype=np.uint8).tolist()
+        heatmap = cv2.resize((cam / peak).astype(np.float32), (size, size), interpolation=cv2.INTER_AREA)
+        return np.clip(heatmap * 255, 0, 255).astype(np.uint8).tolist()
+    
+    def localize_defect(self, image: ImageInput, defect_type: str, confidence: float) -> Dict:
+        """Tek bir sınıf için Grad-CAM lokalizasyonu"""
+        context = self.image_context(image)
+        _, cams = self.predict_batch_with_cam(self.preprocess_image(context))
+        
+        if cams is None:
+            return self._full_image_box(context.shape)
+        
+        return self.cam_to_box(cams[0][self.class_names.index(defect_type)], context.shape)
+    
+    @staticmethod
+    def _full_image_box(image_shape: Tuple[int, ...]) -> Dict:
+        """Lokalizasyon yapılamadığında tüm görüntüyü kapsayan kutu"""
+        h, w = image_shape[:2]
+        return DefectDetectionModel._box_dict(0, 0, w, h)
+    
     def determine_severity(self, defect_type: str, confidence: float) -> str:
         """Hata şiddetini belirler"""
         if defect_type == 'no_defect':
@@ -182,11 +664,12 @@ class DefectDetectionModel:
         else:
             return 'low'
     
-    def analyze_image_quality(self, image_path: str) -> Dict:
+    def analyze_image_quality(self, image: ImageInput) -> Dict:
         """Görüntü kalitesini analiz eder"""
         try:
-            image = cv2.imread(image_path)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            context = self.image_context(image)
+            image = context.bgr
+            gray = context.gray
             
             # Parlaklık
             brightness = np.mean(gray)
@@ -194,20 +677,15 @@ class DefectDetectionModel:
             # Kontrast (standart sapma)
             contrast = np.std(gray)
             
-            # Keskinlik (Laplacian variance)
-            sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+            # Keskinlik (Laplacian variance); 8-bit girdide int16 Laplacian kesin sonuç verir
+            sharpness = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))[1][0, 0] ** 2
             
             # UV yoğunluğu (mavi kanal analizi)
             blue_channel = image[:, :, 0]  # BGR formatında mavi kanal
             uv_intensity = np.mean(blue_channel)
             
             # Kalite skoru hesaplama
-            quality_score = min(100, (
-                (brightness / 255.0) * 25 +
-                (min(contrast, 50) / 50.0) * 25 +
-                (min(sharpness, 1000) / 1000.0) * 25 +
-                (uv_intensity / 255.0) * 25
-            ))
+            quality_score = self._quality_score(brightness, contrast, sharpness, uv_intensity)
             
             return {
                 'brightness': float(brightness),
@@ -216,11 +694,200 @@ class DefectDetectionModel:
                 'uv_intensity': float(uv_intensity),
                 'quality_score': float(quality_score)
             }
-            
+        
         except Exception as e:
             logger.error(f"Görüntü kalitesi analiz hatası: {e}")
             raise
     
+    @staticmethod
+    def _quality_score(brightness, contrast, sharpness, uv_intensity):
+        """Kalite skorunu hesaplar (skaler veya dizi girdilerle çalışır)"""
+        return np.minimum(100, (
+            (brightness / 255.0) * 25 +
+            (np.minimum(contrast, 50) / 50.0) * 25 +
+            (np.minimum(sharpness, 1000) / 1000.0) * 25 +
+            (uv_intensity / 255.0) * 25
+        ))
+    
+    def analyze_image_quality_batch(self, images, sample_stride: int = 1,
+                                    roi: Tuple[int, int, int, int] = None) -> List[Dict]:
+        """Birden çok görüntünün kalitesini tek bir yığın hesaplamasıyla analiz eder
+        
+        images: görüntü yolları / ImageContext listesi ya da (N, H, W, 3) BGR uint8 dizi.
+        Aynı boyuttaki görüntüler birlikte yığınlanır.
+        
+        roi: (x, y, genişlik, yükseklik); verilirse yalnızca bu bölge skorlanır ve
+        bölge kenarları görüntü kenarı gibi ele alınır.
+        
+        sample_stride: s > 1 ise istatistikler her s'inci satır/sütundaki noktalardan
+        hesaplanır. Laplacian bu noktalarda tam çözünürlüklü komşularla hesaplandığı
+        için ölçek küçültmenin aksine keskinlik dağılımı bozulmaz, yalnızca örneklenir.
+        Laplacian float64 yerine tam sayı (int16) olarak tutulur; 8-bit gri girdide
+        kesin sonuç verir ve float64'ün dörtte biri bellek kullanır. Ortalama ve sapma
+        cv2.meanStdDev ile double birikimle hesaplanır.
+        
+        Hata sınırları (n = örnek nokta sayısı, σ gri seviye standart sapması ≤ 127.5):
+          - stride=1: analyze_image_quality ile aynı sonuç (aynı gri dönüşüm ve
+            BORDER_REFLECT_101 Laplacian; fark yalnızca toplama sırasından, ~1e-9 bağıl).
+          - stride=s: parlaklık ve UV ortalamasında |Δ| ≲ 3σ/√n (20 MP, s=4 için
+            n ≈ 1.25M ve |Δ| ≲ 0.35 gri seviye, skorda ≲ 0.035 puan). Kontrast ve
+            keskinlik terimleri 50 ve 1000'de doyduğundan, gerçek değer bu eşiklerin
+            belirgin üzerindeyse skora katkıları değişmez. Adımla hizalı periyodik
+            desenlerde (örtüşme) bu sınırlar geçerli değildir.
+        """
+        try:
+            if isinstance(images, np.ndarray):
+                groups = {images.shape[1:]: (list(range(len(images))), images)}
+            else:
+                groups = {}
+                for i, image in enumerate(images):
+                    bgr = self.image_context(image).bgr
+                    indices, stack = groups.setdefault(bgr.shape, ([], []))
+                    indices.append(i)
+                    stack.append(bgr)
+                groups = {shape: (indices, np.stack(stack)) for shape, (indices, stack) in groups.items()}
+            
+            results = [None] * sum(len(indices) for indices, _ in groups.values())
+            for indices, stack in groups.values():
+                metrics = self._quality_metrics(stack, sample_stride, roi)
+                scores = self._quality_score(*metrics)
+                for j, i in enumerate(indices):
+                    results[i] = {
+                        'brightness': float(metrics[0][j]),
+                        'contrast': float(metrics[1][j]),
+                        'sharpness': float(metrics[2][j]),
+                        'uv_intensity': float(metrics[3][j]),
+                        'quality_score': float(scores[j])
+                    }
+            return results
+        
+        except Exception as e:
+            logger.error(f"Toplu görüntü kalitesi analiz hatası: {e}")
+            raise
+    
+    @staticmethod
+    def _stacked_gray(images: np.ndarray) -> np.ndarray:
+        """(N, H, W, 3) BGR yığınını tek bir cv2 çağrısıyla griye çevirir"""
+        n, h, w = images.shape[:3]
+        flat = np.ascontiguousarray(images).reshape(n * h, w, 3)
+        return cv2.cvtColor(flat, cv2.COLOR_BGR2GRAY).reshape(n, h, w)
+    
+    @staticmethod
+    def _mean_std(stack: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(N, H, W) yığınındaki her görüntü için ortalama ve standart sapma (double birikim)"""
+        stats = [cv2.meanStdDev(np.ascontiguousarray(image)) for image in stack]
+        return (np.array([mean[0, 0] for mean, _ in stats]),
+                np.array([std[0, 0] for _, std in stats]))
+    
+    @classmethod
+    def _quality_metrics(cls, images: np.ndarray, sample_stride: int, roi):
+        """(N, H, W, 3) BGR yığını için parlaklık, kontrast, keskinlik ve UV yoğunluğu"""
+        if roi is not None:
+            x, y, width, height = roi
+            images = images[:, y:y + height, x:x + width]
+        n, h, w = images.shape[:3]
+        s = sample_stride
+        
+        if s <= 4:
+            # Küçük adımlarda komşu satırlar zaten görüntünün çoğunu kapsar; tam çözünürlükte
+            # hesaplayıp örneklemek daha ucuzdur
+            center = cls._stacked_gray(images)
+            # Görüntüler alt alta tek matris olarak işlenir; her görüntünün ilk ve son
+            # satırı komşu görüntüden değer aldığı için BORDER_REFLECT_101'e göre düzeltilir
+            laplacian = cv2.Laplacian(center.reshape(n * h, w), cv2.CV_16S).reshape(n, h, w)
+            if n > 1 and h > 1:
+                laplacian[1:, 0] += center[1:, 1].astype(np.int16) - center[:-1, -1]
+                laplacian[:-1, -1] += center[:-1, -2].astype(np.int16) - center[1:, 0]
+            if s == 1:
+                uv_intensity = np.array([cv2.mean(image)[0] for image in images])
+            else:
+                center, laplacian = center[:, ::s, ::s], laplacian[:, ::s, ::s]
+                uv_intensity = cls._mean_std(images[:, ::s, ::s, 0])[0]
+        else:
+            # Örnek satırlar ve BORDER_REFLECT_101 ile tam çözünürlüklü komşu satırları
+            # tek kopyada toplanıp griye çevrilir, sütunlar sonra örneklenir
+            rows = np.arange(0, h, s)
+            cols = np.arange(0, w, s)
+            up, down = np.abs(rows - 1), (h - 1) - np.abs(h - 2 - rows)
+            left, right = np.abs(cols - 1), (w - 1) - np.abs(w - 2 - cols)
+            
+            gray_up, gray_center, gray_down = np.split(
+                cls._stacked_gray(images[:, np.concatenate([up, rows, down])]), 3, axis=1)
+            center = gray_center[:, :, cols]
+            laplacian = (gray_up[:, :, cols].astype(np.int16) + gray_down[:, :, cols]
+                         + gray_center[:, :, left] + gray_center[:, :, right] - 4 * center.astype(np.int16))
+            uv_intensity = cls._mean_std(images[:, rows[:, None], cols[None, :], 0])[0]
+        
+        brightness, contrast = cls._mean_std(center)
+        sharpness = cls._mean_std(laplacian)[1] ** 2
+        return brightness, contrast, sharpness, uv_intensity
+    
+    def train(self, shard_dir: str, epochs: int = 20, batch_size: int = 16,
+              checkpoint_dir: str = None, shuffle_buffer: int = 1024, cache: bool = True) -> Dict:
+        """Hazırlanmış TFRecord parçalarından modeli eğitir
+        
+        checkpoint_dir verilirse her epoch sonunda model ve optimizer durumu kaydedilir;
+        mevcut bir checkpoint varsa eğitim kaldığı epoch'tan devam eder.
+        """
+        if self.backend != 'keras':
+            raise ValueError(f"{self.backend} modeli eğitilemez, Keras modeli gerekli")
+        
+        with open(Path(shard_dir) / 'dataset.json', 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if tuple(metadata['input_shape']) != tuple(self.input_shape) or metadata['class_names'] != self.class_names:
+            raise ValueError("Hazırlanmış parçalar modelin girdi boyutu veya sınıflarıyla uyuşmuyor")
+        
+        if self.model.optimizer is None:
+            self.compile_model(self.model)
+        
+        train_data = load_training_dataset(shard_dir, metadata, 'train', batch_size, shuffle_buffer, cache)
+        val_data = None
+        if metadata['splits']['val']['count']:
+            val_data = load_training_dataset(shard_dir, metadata, 'val', batch_size, cache=cache)
+        
+        throughput = ThroughputCallback(batch_size, metadata['splits']['train']['count'])
+        callbacks = [throughput]
+        
+        initial_epoch = 0
+        if checkpoint_dir:
+            epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+            checkpoint = tf.train.Checkpoint(model=self.model, optimizer=self.model.optimizer, epoch=epoch)
+            manager = tf.train.CheckpointManager(checkpoint, checkpoint_dir, max_to_keep=3)
+            if manager.latest_checkpoint:
+                checkpoint.restore(manager.latest_checkpoint)
+                initial_epoch = int(epoch.numpy())
+                logger.info(f"Checkpoint yüklendi: {manager.latest_checkpoint} (epoch {initial_epoch})")
+            
+            def save_checkpoint(epoch_index, logs=None):
+                epoch.assign(epoch_index + 1)
+                manager.save(checkpoint_number=epoch_index + 1)
+            
+            callbacks.append(tf.keras.callbacks.LambdaCallback(on_epoch_end=save_checkpoint))
+        
+        if initial_epoch >= epochs:
+            logger.info(f"Eğitim zaten tamamlanmış ({initial_epoch}/{epochs} epoch)")
+            return {'initial_epoch': initial_epoch, 'history': {}}
+        
+        history = self.model.fit(train_data, validation_data=val_data, epochs=epochs,
+                                 initial_epoch=initial_epoch, callbacks=callbacks, verbose=2)
+        # Ağırlıklar değişti; önbellek anahtarları yeniden hesaplanmalı
+        self._fingerprint = None
+        
+        return {
+            'initial_epoch': initial_epoch,
+            'history': {key: [float(v) for v in values] for key, values in history.history.items()}
+        }
+    
+    def weights_fingerprint(self) -> str:
+        """Sonuç önbelleği anahtarları için model sürümü (ilk çağrıda hesaplanır)"""
+        if self._fingerprint is None:
+            params = (self.backend, list(self.input_shape), self.class_names)
+            if self.backend == 'keras':
+                self._fingerprint = model_fingerprint(self.model, *params)
+            else:
+                self._fingerprint = make_key(file_digest(self.model_path), *params)
+        return self._fingerprint
+    
     def save_model(self, save_path: str):
         """Modeli kaydeder"""
         try:
@@ -230,63 +897,759 @@ class DefectDetectionModel:
             logger.error(f"Model kaydetme hatası: {e}")
             raise
     
+    def _serving_function(self):
+        """Dışa aktarma için sabit girdi imzalı çıkarım fonksiyonu"""
+        @tf.function(input_signature=[tf.TensorSpec([None, *self.input_shape], tf.float32, name='images')])
+        def serving(images):
+            return self.inference_model(images, training=False)
+        return serving
+    
+    def _calibration_batches(self, calibration_images: List[str], limit: int = 100) -> Iterator[np.ndarray]:
+        """int8 kalibrasyonu için ön işlenmiş tekil görüntü yığınları üretir"""
+        for image_path in calibration_images[:limit]:
+            yield self.preprocess_image(image_path)
+    
+    def export_model(self, save_path: str, quantize: str = None, calibration_images: List[str] = None,
+                     num_calibration: int = 100):
+        """Modeli TFLite (.tflite) veya ONNX (.onnx) olarak dışa aktarır
+        
+        quantize='int8' için eğitim sonrası statik nicemleme kalibrasyon görüntüleriyle
+        yapılır; girdi ve çıktı float32 kalır, böylece çalışma zamanı aynı ön işlemeyi kullanır.
+        """
+        if quantize not in (None, 'int8'):
+            raise ValueError(f"Desteklenmeyen nicemleme: {quantize}")
+        if quantize and not calibration_images:
+            raise ValueError("int8 nicemleme için kalibrasyon görüntüleri gerekli")
+        
+        try:
+            serving = self._serving_function()
+            suffix = Path(save_path).suffix.lower()
+            
+            if suffix == '.tflite':
+                converter = tf.lite.TFLiteConverter.from_concrete_functions(
+                    [serving.get_concrete_function()], self.inference_model)
+                if quantize == 'int8':
+                    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+                    converter.representative_dataset = lambda: (
+                        [batch] for batch in self._calibration_batches(calibration_images, num_calibration))
+                    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+                with open(save_path, 'wb') as f:
+                    f.write(converter.convert())
+            
+            elif suffix == '.onnx':
+                import tf2onnx
+                
+                float_path = save_path if not quantize else f"{save_path}.float.onnx"
+                tf2onnx.convert.from_function(serving, input_signature=serving.input_signature,
+                                              opset=13, output_path=float_path)
+                if quantize == 'int8':
+                    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                                          QuantType, quantize_static)
+                    
+                    import onnx
+                    
+                    input_name = onnx.load(float_path).graph.input[0].name
+                    batches = self._calibration_batches(calibration_images, num_calibration)
+                    
+                    class ImageReader(CalibrationDataReader):
+                        def get_next(self):
+                            batch = next(batches, None)
+                            return None if batch is None else {input_name: batch}
+                    
+                    quantize_static(float_path, save_path, ImageReader(),
+                                    quant_format=QuantFormat.QDQ,
+                                    activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+                    os.remove(float_path)
+            
+            else:
+                raise ValueError(f"Desteklenmeyen dışa aktarma biçimi: {suffix} (.tflite veya .onnx)")
+            
+            logger.info(f"Model dışa aktarıldı: {save_path} ({quantize or 'float32'})")
+        
+        except Exception as e:
+            logger.error(f"Model dışa aktarma hatası: {e}")
+            raise
+    
     def load_model(self, model_path: str):
-        """Modeli yükler"""
+        """Modeli yükler; uzantıya göre Keras, TFLite veya ONNX çalışma zamanı seçilir"""
         try:
-            self.model = tf.keras.models.load_model(model_path)
-            logger.info(f"Model yüklendi: {model_path}")
+            suffix = Path(model_path).suffix.lower()
+            
+            if suffix == '.tflite':
+                try:
+                    from ai_edge_litert.interpreter import Interpreter
+                except ImportError:
+                    Interpreter = tf.lite.Interpreter
+                self.model = Interpreter(model_path=model_path, num_threads=os.cpu_count())
+                self.model.allocate_tensors()
+                self.backend = 'tflite'
+                self.input_shape = tuple(int(d) for d in self.model.get_input_details()[0]['shape'][1:])
+            elif suffix == '.onnx':
+                import onnxruntime
+                
+                self.model = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+                self.backend = 'onnx'
+                self.input_shape = tuple(int(d) for d in self.model.get_inputs()[0].shape[1:])
+            else:
+                # Derleme (optimizer/metrik) durumu çıkarımda gerekmez
+                self.model = tf.keras.models.load_model(model_path, compile=False)
+                self.backend = 'keras'
+            
+            self.model_path = model_path
+            self._fingerprint = None
+            self._prepare_inference()
+            logger.info(f"Model yüklendi: {model_path} ({self.backend})")
         except Exception as e:
             logger.error(f"Model yükleme hatası: {e}")
             raise
 
+def list_labelled_images(root_dir: str, class_names: List[str]) -> Tuple[List[str], List[int]]:
+    """Sınıf adlı alt klasörlerdeki görüntüleri ve etiketlerini listeler"""
+    image_paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = Path(root_dir) / class_name
+        if class_dir.is_dir():
+            for image_path in list_images(str(class_dir)):
+                image_paths.append(image_path)
+                labels.append(label)
+    return image_paths, labels
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """Her epoch için eğitim hızını görüntü/sn olarak ölçer ve loglara ekler"""
+    
+    def __init__(self, batch_size: int, num_images: int):
+        super().__init__()
+        self.batch_size = batch_size
+        self.num_images = num_images
+        self._start = None
+        self._last = None
+        self._batches = 0
+    
+    def on_epoch_begin(self, epoch, logs=None):
+        self._batches = 0
+        self._start = time.perf_counter()
+    
+    def on_train_batch_end(self, batch, logs=None):
+        self._batches += 1
+        self._last = time.perf_counter()
+    
+    def on_epoch_end(self, epoch, logs=None):
+        # Doğrulama süresi hariç, yalnızca eğitim adımları
+        images = min(self._batches * self.batch_size, self.num_images)
+        images_per_sec = images / max(self._last - self._start, 1e-9)
+        if logs is not None:
+            logs['images_per_sec'] = images_per_sec
+        logger.info(f"Epoch {epoch + 1}: {images_per_sec:.1f} görüntü/sn")
+
+TRAIN_SHARD_PATTERN = '{split}-{index:05d}.tfrecord'
+
+def _dataset_fingerprint(image_paths: List[str], labels: List[int], input_shape: Tuple[int, ...]) -> str:
+    """Dosya listesi, etiketler ve girdi boyutundan parça önbelleği parmak izi üretir"""
+    digest = hashlib.sha1(json.dumps(list(input_shape)).encode())
+    for image_path, label in zip(image_paths, labels):
+        stat = os.stat(image_path)
+        digest.update(f"{image_path}|{label}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def prepare_training_shards(data_dir: str, shard_dir: str, class_names: List[str],
+                            input_shape: Tuple[int, int, int], shard_size: int = 512,
+                            val_split: float = 0.1, workers: int = 4, seed: int = 42) -> Dict:
+    """Etiketli görüntüleri bir kez çözüp ölçekler ve parçalı TFRecord dosyalarına yazar
+    
+    Görüntüler ham uint8 olarak saklanır, eğitimde yeniden JPEG çözme yapılmaz. Aynı veri
+    kümesi için hazırlanmış parçalar varsa yeniden kullanılır.
+    """
+    image_paths, labels = list_labelled_images(data_dir, class_names)
+    if not image_paths:
+        raise ValueError(f"Eğitim görüntüsü bulunamadı: {data_dir}")
+    
+    shard_dir = Path(shard_dir)
+    metadata_path = shard_dir / 'dataset.json'
+    fingerprint = _dataset_fingerprint(image_paths, labels, input_shape)
+    if metadata_path.exists():
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if metadata.get('fingerprint') == fingerprint:
+            logger.info(f"Hazırlanmış parçalar kullanılıyor: {shard_dir}")
+            return metadata
+        metadata_path.unlink()
+    
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    for old_shard in shard_dir.glob('*.tfrecord'):
+        old_shard.unlink()
+    
+    order = np.random.default_rng(seed).permutation(len(image_paths))
+    num_val = int(len(order) * val_split)
+    splits = {'train': order[num_val:], 'val': order[:num_val]}
+    size = (input_shape[1], input_shape[0])
+    
+    def load(index: int):
+        try:
+            return ImageContext(image_paths[index]).resized(size), labels[index]
+        except Exception as e:
+            logger.warning(f"Görüntü atlandı: {image_paths[index]} ({e})")
+            return None, None
+    
+    metadata = {
+        'class_names': class_names,
+        'input_shape': list(input_shape),
+        'fingerprint': fingerprint,
+        'splits': {}
+    }
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for split, indices in splits.items():
+            shards, count, writer = [], 0, None
+            for future in _prefetch(executor, load, indices, workers * 4):
+                image, label = future.result()
+                if image is None:
+                    continue
+                if count % shard_size == 0:
+                    if writer:
+                        writer.close()
+                    shards.append(TRAIN_SHARD_PATTERN.format(split=split, index=len(shards)))
+                    writer = tf.io.TFRecordWriter(str(shard_dir / shards[-1]))
+                example = tf.train.Example(features=tf.train.Features(feature={
+                    'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[image.tobytes()])),
+                    'label': tf.train.Feature(int64_list=tf.train.Int64List(value=[label]))
+                }))
+                writer.write(example.SerializeToString())
+                count += 1
+            if writer:
+                writer.close()
+            metadata['splits'][split] = {'shards': shards, 'count': count}
+    
+    # Meta veri en son yazılır; yarım kalan hazırlık yeniden kullanılmaz
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    
+    total = sum(split['count'] for split in metadata['splits'].values())
+    elapsed = time.perf_counter() - start
+    logger.info(f"{total} görüntü {elapsed:.1f} sn'de {shard_dir} klasörüne hazırlandı "
+                f"({total / max(elapsed, 1e-9):.1f} görüntü/sn)")
+    return metadata
+
+def load_training_dataset(shard_dir: str, metadata: Dict, split: str = 'train', batch_size: int = 16,
+                          shuffle_buffer: int = 1024, cache: bool = True) -> tf.data.Dataset:
+    """Parçaları paralel okuyan, önbellekli ve önden yüklemeli tf.data hattı kurar"""
+    autotune = tf.data.AUTOTUNE
+    height, width, channels = metadata['input_shape']
+    num_classes = len(metadata['class_names'])
+    training = split == 'train'
+    files = [str(Path(shard_dir) / name) for name in metadata['splits'][split]['shards']]
+    
+    features = {
+        'image': tf.io.FixedLenFeature([], tf.string),
+        'label': tf.io.FixedLenFeature([], tf.int64)
+    }
+    
+    def parse(record):
+        example = tf.io.parse_single_example(record, features)
+        image = tf.reshape(tf.io.decode_raw(example['image'], tf.uint8), (height, width, channels))
+        return image, example['label']
+    
+    def normalize(images, labels):
+        return tf.cast(images, tf.float32) / 255.0, tf.one_hot(labels, num_classes)
+    
+    dataset = tf.data.Dataset.from_tensor_slices(files)
+    if training:
+        dataset = dataset.shuffle(len(files))
+    dataset = dataset.interleave(tf.data.TFRecordDataset, num_parallel_calls=autotune,
+                                 deterministic=not training)
+    dataset = dataset.map(parse, num_parallel_calls=autotune)
+    
+    # uint8 olarak önbelleğe al: float32'ye göre dört kat az bellek
+    if cache:
+        dataset = dataset.cache()
+    if training:
+        dataset = dataset.shuffle(shuffle_buffer)
+    
+    return (dataset.batch(batch_size)
+            .map(normalize, num_parallel_calls=autotune)
+            .prefetch(autotune))
+
+def compare_backends(reference: DefectDetectionModel, candidates: Dict[str, DefectDetectionModel],
+                     image_paths: List[str], labels: List[int] = None, warmup: int = 3) -> Dict:
+    """Dışa aktarılan modelleri Keras modeliyle gecikme ve doğruluk açısından karşılaştırır"""
+    images = [reference.preprocess_image(image_path) for image_path in image_paths]
+    
+    def run(detector):
+        for image in images[:warmup]:
+            detector.predict_batch(image)
+        latencies, predictions = [], []
+        for image in images:
+            start = time.perf_counter()
+            predictions.append(detector.predict_batch(image)[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return np.array(latencies), np.array(predictions)
+    
+    reference_latency, reference_predictions = run(reference)
+    models = {'keras': (reference_latency, reference_predictions)}
+    models.update({name: run(detector) for name, detector in candidates.items()})
+    
+    report = {'num_images': len(images)}
+    for name, (latencies, predictions) in models.items():
+        entry = {
+            'latency_ms_p50': float(np.percentile(latencies, 50)),
+            'latency_ms_p95': float(np.percentile(latencies, 95)),
+            'speedup_vs_keras': float(np.median(reference_latency) / np.median(latencies)),
+            'top1_agreement_with_keras': float(np.mean(predictions.argmax(1) == reference_predictions.argmax(1))),
+            'max_abs_prob_diff': float(np.max(np.abs(predictions - reference_predictions)))
+        }
+        if labels:
+            entry['accuracy'] = float(np.mean(predictions.argmax(1) == np.array(labels)))
+        report[name] = entry
+    return report
+
+def build_report(image_path: str, quality: Dict, detections: List[Dict]) -> Dict:
+    """Kalite ve tespit sonuçlarından rapor sözlüğünü oluşturur"""
+    return {
+        'image_path': image_path,
+        'image_quality': quality,
+        'detections': detections,
+        'summary': {
+            'total_defects': len(detections),
+            'high_severity': len([d for d in detections if d['severity'] == 'high']),
+            'medium_severity': len([d for d in detections if d['severity'] == 'medium']),
+            'low_severity': len([d for d in detections if d['severity'] == 'low']),
+            'overall_status': 'pass' if len(detections) == 0 else 
+                            'reject' if any(d['severity'] == 'high' for d in detections) else 'review'
+        }
+    }
+
+def analyze_image(detector: DefectDetectionModel, image_path: str, threshold: float = 0.3,
+                  return_heatmaps: bool = False, tiled: bool = False, tile_overlap: float = 0.25,
+                  cache: ResultCache = None) -> Dict:
+    """Tek bir görüntü için kalite analizi ve hata tespiti sonucunu hazırlar
+    
+    Önbellek verilirse ham çıktılar (kalite, olasılıklar, kutular) ve eşiklenmiş rapor
+    ayrı saklanır; yalnızca eşik değiştiğinde çıkarım yapılmaz. Aşama süreleri
+    rapordaki timing['stages'] alanına ve süreç geneli ölçüm kaydına yazılır.
+    """
+    with INSTRUMENTATION.request(ENGINE_NAME) as trace:
+        raw = None
+        if cache is not None:
+            with stage('cache'):
+                raw_key = raw_cache_key(detector, file_digest(image_path), tiled, tile_overlap)
+                report_key = make_key(raw_key, threshold, return_heatmaps)
+                report = cache.get('reports', report_key)
+                if report is None:
+                    raw = cache.get('raw', raw_key)
+            if report is not None:
+                report['image_path'] = image_path
+                report['timing'] = {'cache': 'report', 'stages': trace.to_dict()['stages']}
+                return report
+    
+        if raw is not None:
+            timing = {'cache': 'raw'}
+        else:
+            # Görüntü bir kez çözülür, tüm adımlar aynı bağlamı kullanır
+            with stage('decode'):
+                context = ImageContext(image_path)
+                context.bgr
+            raw, timing = compute_raw(detector, context, tiled, tile_overlap)
+            if cache is not None:
+                cache.put('raw', raw_key, raw)
+                timing['cache'] = 'miss'
+        
+        with stage('postprocess'):
+            detections = detector.detections_from_raw(raw, threshold, return_heatmaps)
+            report = build_report(image_path, raw['quality'], detections)
+        if cache is not None:
+            cache.put('reports', report_key, report)
+        timing['stages'] = trace.to_dict()['stages']
+        report['timing'] = timing
+        return report
+
+def compute_raw(detector: DefectDetectionModel, context: ImageContext, tiled: bool = False,
+                tile_overlap: float = 0.25) -> Tuple[Dict, Dict]:
+    """Kalite analizi ve hata tespitinin eşikten bağımsız ham çıktısı; (ham çıktı, süreler)"""
+    # Görüntü kalitesini analiz et
+    with stage('quality'):
+        quality = detector.analyze_image_quality(context)
+    logger.info(f"Görüntü kalitesi: {quality['quality_score']:.1f}")
+    
+    if quality['quality_score'] < 70:
+        logger.warning("Görüntü kalitesi düşük!")
+    
+    # Hata tespiti yap
+    if tiled:
+        raw = detector.predict_raw_tiled(context, overlap=tile_overlap)
+    else:
+        raw = detector.predict_raw(context)
+    raw['quality'] = quality
+    
+    # Lokalizasyonun düz çıkarıma göre ek maliyeti
+    return raw, dict(detector.last_timing)
+
+def analyze_context(detector: DefectDetectionModel, context: ImageContext, image_path: str = None,
+                    threshold: float = 0.3, return_heatmaps: bool = False, tiled: bool = False,
+                    tile_overlap: float = 0.25) -> Dict:
+    """Önbelleksiz `analyze_image`; çözülmüş görüntü bağlamı üzerinde rapor hazırlar"""
+    raw, timing = compute_raw(detector, context, tiled, tile_overlap)
+    report = build_report(image_path, raw['quality'],
+                          detector.detections_from_raw(raw, threshold, return_heatmaps))
+    report['timing'] = timing
+    return report
+
+def raw_cache_key(detector: DefectDetectionModel, image_digest: str, tiled: bool = False,
+                  tile_overlap: float = 0.25) -> str:
+    """Görüntü içeriği, model sürümü ve eşikten bağımsız parametrelerden ham çıktı anahtarı"""
+    return make_key('defect_detection', image_digest, detector.weights_fingerprint(),
+                    tiled, tile_overlap if tiled else None)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff'}
+
+def list_images(image_dir: str = None, manifest: str = None) -> List[str]:
+    """Klasördeki veya manifest dosyasındaki görüntü yollarını listeler"""
+    if image_dir:
+        return sorted(
+            str(p) for p in Path(image_dir).iterdir()
+            if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS
+        )
+    
+    # Manifest: her satırda bir yol, göreli yollar manifest klasörüne göre
+    base_dir = Path(manifest).parent
+    paths = []
+    with open(manifest, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            path = Path(line)
+            paths.append(str(path if path.is_absolute() else base_dir / path))
+    return paths
+
+def _prefetch(executor: ThreadPoolExecutor, fn, items: Iterable, depth: int) -> Iterator[Future]:
+    """En fazla `depth` iş önde olacak şekilde sıralı future üretir"""
+    items = iter(items)
+    pending = deque(executor.submit(fn, item) for item in islice(items, depth))
+    while pending:
+        future = pending.popleft()
+        for item in islice(items, 1):
+            pending.append(executor.submit(fn, item))
+        yield future
+
+def analyze_batch(detector: DefectDetectionModel, image_paths: Iterable[str], threshold: float = 0.3,
+                  batch_size: int = 16, workers: int = 4, prefetch_batches: int = 2,
+                  return_heatmaps: bool = False, cache: ResultCache = None) -> Iterator[Dict]:
+    """Görüntüleri paralel ön işleyip yığınlar halinde analiz eder, sonuçları sırayla üretir
+    
+    Önbellekte ham çıktısı bulunan görüntüler çözülmez ve çıkarıma girmez. Yüklenemeyen
+    görüntünün hata kaydı yığında yer tutar, giriş sırasındaki yerinde üretilir.
+    """
+    if cache is not None:
+        # İş parçacıklarından önce bir kez hesapla
+        detector.weights_fingerprint()
+    
+    def load(image_path: str):
+        try:
+            item = {'image_path': image_path, 'raw': None, 'raw_key': None}
+            if cache is not None:
+                item['raw_key'] = raw_cache_key(detector, file_digest(image_path))
+                item['raw'] = cache.get('raw', item['raw_key'])
+                if item['raw'] is not None:
+                    return item, None
+            
+            with INSTRUMENTATION.stage(BATCH_ENGINE_NAME, 'decode'):
+                context = ImageContext(image_path)
+                context.bgr
+            with INSTRUMENTATION.stage(BATCH_ENGINE_NAME, 'quality'):
+                item['quality'] = detector.analyze_image_quality(context)
+            with INSTRUMENTATION.stage(BATCH_ENGINE_NAME, 'preprocess'):
+                item['image'] = detector.preprocess_image(context)[0]
+            # Yığın beklerken tam çözünürlüklü görüntüyü bellekte tutma
+            context.release()
+            item['context'] = context
+            return item, None
+        except Exception as e:
+            return {'image_path': image_path}, e
+    
+    def flush(batch):
+        pending = [item for item in batch if 'error' not in item and item['raw'] is None]
+        if pending:
+            with INSTRUMENTATION.stage(BATCH_ENGINE_NAME, 'inference'):
+                predictions, cams = detector.predict_batch_with_cam(np.stack([item['image'] for item in pending]))
+            for i, item in enumerate(pending):
+                item['raw'] = detector.raw_predictions(item['context'].shape, predictions[i:i + 1],
+                                                       cams[i:i + 1] if cams is not None else None)
+                item['raw']['quality'] = item['quality']
+                if cache is not None:
+                    cache.put('raw', item['raw_key'], item['raw'])
+        
+        for item in batch:
+            if 'error' in item:
+                yield item
+                continue
+            with INSTRUMENTATION.stage(BATCH_ENGINE_NAME, 'postprocess'):
+                detections = detector.detections_from_raw(item['raw'], threshold, return_heatmaps)
+                report = build_report(item['image_path'], item['raw']['quality'], detections)
+            yield report
+    
+    batch = []
+    loaded = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in _prefetch(executor, load, image_paths, batch_size * prefetch_batches):
+            item, error = future.result()
+            if error is not None:
+                logger.error(f"Görüntü ön işleme hatası ({item['image_path']}): {error}")
+                batch.append({'image_path': item['image_path'], 'error': str(error)})
+                continue
+            
+            batch.append(item)
+            loaded += 1
+            if loaded == batch_size:
+                yield from flush(batch)
+                batch = []
+                loaded = 0
+        
+        if batch:
+            yield from flush(batch)
+
+def analyze_pooled(image_paths: Iterable[str], pool_workers: int, model_options: Dict = None,
+                   threshold: float = 0.3, return_heatmaps: bool = False, tiled: bool = False,
+                   tile_overlap: float = 0.25, decode_workers: int = 4) -> Iterator[Dict]:
+    """Görüntüleri sıcak modelli işçi süreçlerde analiz eder, sonuçları sırayla üretir
+    
+    Ana süreç yalnızca görüntüleri çözer; görüntüler işçilere paylaşımlı bellekle aktarılır.
+    """
+    from worker_pool import DEFECT_KIND, WorkerPool
+    
+    threads = max(1, (os.cpu_count() or 1) // pool_workers)
+    with WorkerPool({DEFECT_KIND: pool_workers}, {DEFECT_KIND: model_options or {}},
+                    {DEFECT_KIND: threads}) as pool:
+        for image_path, future in pool.imap(DEFECT_KIND, 'analyze', image_paths, threshold,
+                                            return_heatmaps, tiled, tile_overlap,
+                                            decode_workers=decode_workers):
+            try:
+                report, _ = future.result()
+            except Exception as e:
+                logger.error(f"Görüntü analiz hatası ({image_path}): {e}")
+                yield {'image_path': image_path, 'error': str(e)}
+                continue
+            report['image_path'] = image_path
+            yield report
+
+def create_app(detector: DefectDetectionModel, default_threshold: float = 0.3, cache: ResultCache = None):
+    """Modeli bellekte tutan FastAPI uygulamasını oluşturur"""
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import PlainTextResponse
+    from pydantic import BaseModel
+    
+    class AnalyzeRequest(BaseModel):
+        image_path: str
+        threshold: float = default_threshold
+        return_heatmaps: bool = False
+        tiled: bool = False
+    
+    app = FastAPI(title='ReFlow AI Defect Detection')
+    # Keras modeli eşzamanlı çağrılar için güvenli değil
+    lock = threading.Lock()
+    
+    @app.get('/health')
+    def health():
+        status = {'status': 'ok', 'input_shape': list(detector.input_shape)}
+        if cache is not None:
+            status['cache'] = cache.stats()
+        return status
+    
+    @app.get('/metrics')
+    def metrics(format: str = 'prometheus'):
+        """Aşama gecikme histogramları: Prometheus metni ya da format=json ile özet"""
+        if format == 'json':
+            return INSTRUMENTATION.summary()
+        return PlainTextResponse(INSTRUMENTATION.prometheus(), media_type='text/plain; version=0.0.4')
+    
+    @app.post('/analyze')
+    def analyze(request: AnalyzeRequest):
+        if not os.path.exists(request.image_path):
+            raise HTTPException(status_code=400, detail=f"Görüntü bulunamadı: {request.image_path}")
+        try:
+            with lock:
+                return analyze_image(detector, request.image_path, request.threshold,
+                                     request.return_heatmaps, request.tiled, cache=cache)
+        except Exception as e:
+            logger.error(f"Analiz hatası: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    return app
+
+def serve(detector: DefectDetectionModel, host: str = '127.0.0.1', port: int = 8765,
+          default_threshold: float = 0.3, cache: ResultCache = None):
+    """Yüklenmiş ve ısındırılmış modelle HTTP üzerinden istek bekler"""
+    import uvicorn
+    
+    app = create_app(detector, default_threshold, cache)
+    logger.info(f"Servis başlatılıyor: http://{host}:{port}")
+    uvicorn.run(app, host=host, port=port)
+
+def train_main(argv: List[str]) -> int:
+    """`train` alt komutu: veri kümesini bir kez parçalara hazırlar ve modeli eğitir"""
+    parser = argparse.ArgumentParser(prog='defect_detection.py train',
+                                     description='ReFlow AI Defect Detection - model eğitimi')
+    parser.add_argument('--data-dir', type=str, required=True, help='Sınıf adlı alt klasörlerde etiketli görüntüler')
+    parser.add_argument('--shard-dir', type=str, required=True, help='Hazırlanmış TFRecord parçalarının klasörü')
+    parser.add_argument('--epochs', type=int, default=20, help='Toplam epoch sayısı')
+    parser.add_argument('--batch-size', type=int, default=16, help='Eğitim yığın boyutu')
+    parser.add_argument('--val-split', type=float, default=0.1, help='Doğrulamaya ayrılan oran')
+    parser.add_argument('--shard-size', type=int, default=512, help='Parça başına görüntü sayısı')
+    parser.add_argument('--shuffle-buffer', type=int, default=1024, help='Karıştırma tamponu boyutu')
+    parser.add_argument('--workers', type=int, default=4, help='Hazırlıkta paralel çözme iş parçacığı sayısı')
+    parser.add_argument('--no-cache', action='store_true', help='Çözülmüş parçaları bellekte önbelleğe alma')
+    parser.add_argument('--checkpoint-dir', type=str, help='Checkpoint klasörü (varsa eğitime devam edilir)')
+    parser.add_argument('--model', type=str, help='Başlangıç model dosyası')
+    parser.add_argument('--output', type=str, help='Eğitilen modelin kaydedileceği yol')
+    parser.add_argument('--prepare-only', action='store_true', help='Yalnızca parçaları hazırla')
+    
+    args = parser.parse_args(argv)
+    
+    try:
+        detector = DefectDetectionModel(model_path=args.model, warmup=False)
+        metadata = prepare_training_shards(args.data_dir, args.shard_dir, detector.class_names,
+                                           detector.input_shape, args.shard_size, args.val_split,
+                                           args.workers)
+        if args.prepare_only:
+            print(json.dumps(metadata['splits'], indent=2, ensure_ascii=False))
+            return 0
+        
+        result = detector.train(args.shard_dir, args.epochs, args.batch_size, args.checkpoint_dir,
+                                args.shuffle_buffer, cache=not args.no_cache)
+        
+        if args.output:
+            detector.save_model(args.output)
+        
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    
+    except Exception as e:
+        logger.error(f"Eğitim hatası: {e}")
+        return 1
+    
+    return 0
+
+def write_ndjson(results: Iterable[Dict], output_path: str = None):
+    """Her sonucu bir satır JSON olarak yazdırır, istenirse dosyaya da yazar"""
+    output_file = open(output_path, 'w', encoding='utf-8') if output_path else None
+    try:
+        for result in results:
+            with INSTRUMENTATION.stage(BATCH_ENGINE_NAME, 'serialize'):
+                line = json.dumps(result, ensure_ascii=False)
+            print(line, flush=True)
+            if output_file:
+                output_file.write(line + '\n')
+                output_file.flush()
+    finally:
+        if output_file:
+            output_file.close()
+
 def main():
     """Ana fonksiyon - komut satırından çalıştırma için"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'train':
+        return train_main(sys.argv[2:])
+    
     parser = argparse.ArgumentParser(description='ReFlow AI Defect Detection')
-    parser.add_argument('--image', type=str, required=True, help='Analiz edilecek görüntü yolu')
+    parser.add_argument('--image', type=str, help='Analiz edilecek görüntü yolu')
+    parser.add_argument('--image-dir', type=str, help='Toplu analiz edilecek görüntü klasörü')
+    parser.add_argument('--manifest', type=str, help='Her satırda bir görüntü yolu içeren dosya')
+    parser.add_argument('--batch-size', type=int, default=16, help='Toplu analizde yığın boyutu')
+    parser.add_argument('--workers', type=int, default=4, help='Paralel ön işleme iş parçacığı sayısı')
+    parser.add_argument('--pool-workers', type=int, default=0,
+                        help='Toplu analizi bu sayıda sıcak modelli işçi süreçte çalıştır (0: kapalı)')
     parser.add_argument('--model', type=str, help='Model dosyası yolu')
     parser.add_argument('--threshold', type=float, default=0.3, help='Güven eşiği')
+    parser.add_argument('--xla', action='store_true', help='Çıkarım fonksiyonunu XLA ile derle')
     parser.add_argument('--output', type=str, help='Sonuç dosyası yolu')
+    parser.add_argument('--heatmaps', action='store_true', help='Tespitlere küçük Grad-CAM haritaları ekle')
+    parser.add_argument('--tiled', action='store_true', help='Büyük görüntüleri örtüşen karolarla analiz et')
+    parser.add_argument('--tile-overlap', type=float, default=0.25, help='Karolar arası örtüşme oranı')
+    parser.add_argument('--serve', action='store_true', help='Modeli bellekte tutan HTTP servisini başlat')
+    parser.add_argument('--export', type=str, help='Modeli .tflite veya .onnx olarak dışa aktar')
+    parser.add_argument('--quantize', type=str, choices=['int8'], help='Dışa aktarmada eğitim sonrası nicemleme')
+    parser.add_argument('--calibration-dir', type=str, help='int8 kalibrasyon görüntüleri klasörü')
+    parser.add_argument('--eval-dir', type=str, help='Karşılaştırma raporu için sınıf alt klasörlü görüntüler')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Servis adresi')
+    parser.add_argument('--port', type=int, default=8765, help='Servis portu')
+    parser.add_argument('--cache-dir', type=str, help='İçerik adresli sonuç önbelleği klasörü')
+    parser.add_argument('--cache-size-mb', type=int, default=1024, help='Sonuç önbelleği boyut sınırı (MB)')
+    parser.add_argument('--metrics-out', type=str,
+                        help='Aşama gecikme metriklerini yaz (.prom/.txt: Prometheus metni, diğerleri JSON)')
+    parser.add_argument('--profile-dir', type=str, help='Tek görüntü isteğinin TensorFlow profil izini buraya yaz')
     
     args = parser.parse_args()
     
+    if not (args.serve or args.export or args.image or args.image_dir or args.manifest):
+        parser.error('--image, --image-dir, --manifest, --serve veya --export belirtilmeli')
+    if args.pool_workers and args.cache_dir:
+        parser.error('--pool-workers ile --cache-dir birlikte kullanılamaz')
+    
     try:
+        if args.pool_workers and (args.image_dir or args.manifest):
+            # Modeller işçi süreçlerde yüklenir, ana süreçte model kurulmaz
+            image_paths = list_images(args.image_dir, args.manifest)
+            logger.info(f"{len(image_paths)} görüntü {args.pool_workers} işçi süreçte analiz edilecek")
+            results = analyze_pooled(image_paths, args.pool_workers, {'model_path': args.model, 'xla': args.xla},
+                                     args.threshold, args.heatmaps, args.tiled, args.tile_overlap, args.workers)
+            write_ndjson(results, args.output)
+            if args.metrics_out:
+                INSTRUMENTATION.write(args.metrics_out)
+            return 0
+        
         # Model oluştur
-        detector = DefectDetectionModel(model_path=args.model)
-        
-        # Görüntü kalitesini analiz et
-        quality = detector.analyze_image_quality(args.image)
-        logger.info(f"Görüntü kalitesi: {quality['quality_score']:.1f}")
-        
-        if quality['quality_score'] < 70:
-            logger.warning("Görüntü kalitesi düşük!")
-        
-        # Hata tespiti yap
-        detections = detector.predict_defects(args.image, args.threshold)
-        
-        # Sonuçları hazırla
-        result = {
-            'image_path': args.image,
-            'image_quality': quality,
-            'detections': detections,
-            'summary': {
-                'total_defects': len(detections),
-                'high_severity': len([d for d in detections if d['severity'] == 'high']),
-                'medium_severity': len([d for d in detections if d['severity'] == 'medium']),
-                'low_severity': len([d for d in detections if d['severity'] == 'low']),
-                'overall_status': 'pass' if len(detections) == 0 else 
-                                'reject' if any(d['severity'] == 'high' for d in detections) else 'review'
-            }
-        }
+        detector = DefectDetectionModel(model_path=args.model, xla=args.xla)
+        cache = ResultCache(args.cache_dir, args.cache_size_mb * 1024 * 1024) if args.cache_dir else None
+        
+        if args.serve:
+            serve(detector, args.host, args.port, args.threshold, cache)
+            return 0
+        
+        if args.export:
+            calibration_images = list_images(args.calibration_dir) if args.calibration_dir else None
+            detector.export_model(args.export, args.quantize, calibration_images)
+            
+            # Dışa aktarılan modeli Keras modeliyle karşılaştır
+            if args.eval_dir:
+                image_paths, labels = list_labelled_images(args.eval_dir, detector.class_names)
+            else:
+                image_paths, labels = calibration_images, None
+            if image_paths:
+                exported = DefectDetectionModel(model_path=args.export)
+                report = compare_backends(detector, {exported.backend: exported}, image_paths, labels)
+                print(json.dumps(report, indent=2, ensure_ascii=False))
+            return 0
+        
+        if args.image_dir or args.manifest:
+            # Toplu mod: her görüntü için bir satır NDJSON
+            image_paths = list_images(args.image_dir, args.manifest)
+            logger.info(f"{len(image_paths)} görüntü analiz edilecek")
+            
+            write_ndjson(analyze_batch(detector, image_paths, args.threshold, args.batch_size, args.workers,
+                                       return_heatmaps=args.heatmaps, cache=cache), args.output)
+            if args.metrics_out:
+                INSTRUMENTATION.write(args.metrics_out)
+            return 0
+        
+        if args.profile_dir:
+            INSTRUMENTATION.profile_next(args.profile_dir, 'tensorflow')
+        
+        # İstek analiz ve JSON serileştirmeyi kapsar, model yükleme hariç
+        with INSTRUMENTATION.request(ENGINE_NAME) as trace:
+            result = analyze_image(detector, args.image, args.threshold, args.heatmaps,
+                                   args.tiled, args.tile_overlap, cache)
+            with stage('serialize'):
+                output = json.dumps(result, indent=2, ensure_ascii=False)
+        logger.info(f"Aşama süreleri (ms): { {name: round(values['wall_ms'], 1) for name, values in trace.stages.items()} }")
+        if args.metrics_out:
+            INSTRUMENTATION.write(args.metrics_out)
         
         # Sonuçları yazdır
-        print(json.dumps(result, indent=2, ensure_ascii=False))
+        print(output)
         
         # Dosyaya kaydet
         if args.output:
             with open(args.output, 'w', encoding='utf-8') as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+                f.write(output)
             logger.info(f"Sonuçlar kaydedildi: {args.output}")
-        
+    
     except Exception as e:
         logger.error(f"Analiz hatası: {e}")
         return 1
@@ -294,4 +1657,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    exit(main()) 
\ No newline at end of file
+    exit(main())
\ No newline at end of file
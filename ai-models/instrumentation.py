@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+ReFlow AI Instrumentation
+Analiz motorları için aşama bazlı süre/CPU/bellek ölçümü, gecikme histogramları ve profil yakalama
+"""
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Prometheus histogram sınırları (saniye)
+DEFAULT_BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROFILER_BACKENDS = ('torch', 'tensorflow')
+
+# Etkin istek izi; ThreadPoolExecutor'a contextvars.copy_context().run ile taşınır
+_current_trace = contextvars.ContextVar('reflow_trace', default=None)
+
+def peak_rss_bytes() -> int:
+    """Sürecin şimdiye kadarki en yüksek yerleşik belleği (bayt); desteklenmiyorsa 0"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS bayt döndürür
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class StageHistogram:
+    """Bir aşamanın gecikme histogramı, CPU toplamı ve yüzdelikler için son örnekler"""
+    
+    def __init__(self, buckets_s: Tuple[float, ...], reservoir: int):
+        self.buckets_s = buckets_s
+        self.bucket_counts = [0] * len(buckets_s)
+        self.count = 0
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss_delta = 0
+        self.recent_ms = deque(maxlen=reservoir)
+    
+    def observe(self, wall_ms: float, cpu_ms: float = None, peak_rss_delta: int = 0):
+        wall_s = wall_ms / 1000
+        for i, bound in enumerate(self.buckets_s):
+            if wall_s <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.wall_s += wall_s
+        self.cpu_s += (cpu_ms or 0.0) / 1000
+        self.peak_rss_delta = max(self.peak_rss_delta, peak_rss_delta)
+        self.recent_ms.append(wall_ms)
+    
+    def summary(self) -> Dict:
+        recent = np.array(self.recent_ms)
+        return {
+            'count': self.count,
+            'mean_ms': self.wall_s / self.count * 1000,
+            'p50_ms': float(np.percentile(recent, 50)),
+            'p95_ms': float(np.percentile(recent, 95)),
+            'p99_ms': float(np.percentile(recent, 99)),
+            'max_ms': float(recent.max()),
+            'cpu_mean_ms': self.cpu_s / self.count * 1000,
+            'peak_rss_delta_mb': self.peak_rss_delta / MB
+        }
+
+class RequestTrace:
+    """Tek isteğin aşama ölçümleri; aynı ad tekrar ölçülürse süreler toplanır"""
+    
+    def __init__(self, instrumentation: 'Instrumentation', engine: str):
+        self.instrumentation = instrumentation
+        self.engine = engine
+        self.stages = {}
+        # Profil izleyicisi yalnızca çağıran iş parçacığını yakalar
+        self.profiling = False
+        self.profile_path = None
+        self._lock = threading.Lock()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        self._start_rss = peak_rss_bytes()
+    
+    def add(self, name: str, wall_ms: float, cpu_ms: float = None, peak_rss_delta: int = 0):
+        with self._lock:
+            stage = self.stages.setdefault(name, {'wall_ms': 0.0, 'cpu_ms': 0.0, 'calls': 0,
+                                                  'peak_rss_delta_mb': 0.0})
+            stage['wall_ms'] += wall_ms
+            stage['cpu_ms'] += cpu_ms or 0.0
+            stage['calls'] += 1
+            stage['peak_rss_delta_mb'] = max(stage['peak_rss_delta_mb'], peak_rss_delta / MB)
+    
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = {name: dict(values) for name, values in self.stages.items()}
+        result = {
+            'engine': self.engine,
+            'total_ms': (time.perf_counter() - self._start_wall) * 1000,
+            'cpu_ms': (time.process_time() - self._start_cpu) * 1000,
+            'peak_rss_mb': peak_rss_bytes() / MB,
+            'peak_rss_delta_mb': (peak_rss_bytes() - self._start_rss) / MB,
+            'stages': stages
+        }
+        if self.profile_path:
+            result['profile'] = self.profile_path
+        return result
+
+class Instrumentation:
+    """Motor ve aşama başına gecikme histogramları
+    
+    CPU süresi `time.process_time` farkıdır: eşzamanlı çalışan aşamalarda tüm sürecin
+    CPU'sunu içerir. Bellek ölçüsü süreç tepe RSS'indeki artıştır (yalnızca yeni tepe
+    oluştuğunda artar). `profile_next` bir sonraki isteği torch veya TensorFlow
+    profil izleyicisiyle yakalar.
+    """
+    
+    def __init__(self, namespace: str = 'reflow', buckets_s: Tuple[float, ...] = DEFAULT_BUCKETS_S,
+                 reservoir: int = 2048):
+        self.namespace = namespace
+        self.buckets_s = tuple(buckets_s)
+        self.reservoir = reservoir
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._profile = None
+    
+    def observe(self, engine: str, name: str, wall_ms: float, cpu_ms: float = None, peak_rss_delta: int = 0):
+        with self._lock:
+            histogram = self._histograms.get((engine, name))
+            if histogram is None:
+                histogram = self._histograms[(engine, name)] = StageHistogram(self.buckets_s, self.reservoir)
+            histogram.observe(wall_ms, cpu_ms, peak_rss_delta)
+    
+    def record(self, engine: str, name: str, wall_ms: float, cpu_ms: float = None):
+        """Başka yerde ölçülmüş aşama süresini (ör. işçi süreçten gelen) kaydeder"""
+        self.observe(engine, name, wall_ms, cpu_ms)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, wall_ms, cpu_ms)
+    
+    @contextmanager
+    def stage(self, engine: str, name: str) -> Iterator[None]:
+        """Bloğun süresini histogramlara ve varsa etkin istek izine yazar"""
+        start_rss = peak_rss_bytes()
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_ms = (time.perf_counter() - start) * 1000
+            cpu_ms = (time.process_time() - start_cpu) * 1000
+            rss_delta = peak_rss_bytes() - start_rss
+            self.observe(engine, name, wall_ms, cpu_ms, rss_delta)
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.add(name, wall_ms, cpu_ms, rss_delta)
+    
+    @contextmanager
+    def request(self, engine: str) -> Iterator[RequestTrace]:
+        """İstek izini başlatır; iç içe çağrılarda dıştaki iz kullanılır
+        
+        İstek bitince toplam süre '<engine>' motorunun 'total' aşamasına yazılır.
+        """
+        trace = _current_trace.get()
+        if trace is not None:
+            yield trace
+            return
+        
+        trace = RequestTrace(self, engine)
+        token = _current_trace.set(trace)
+        profiler = self._start_profile(engine)
+        trace.profiling = profiler is not None
+        try:
+            yield trace
+        finally:
+            if profiler is not None:
+                trace.profile_path = profiler()
+            _current_trace.reset(token)
+            summary = trace.to_dict()
+            self.observe(engine, 'total', summary['total_ms'], summary['cpu_ms'],
+                         int(summary['peak_rss_delta_mb'] * MB))
+    
+    def profile_next(self, output_dir: str, backend: str = 'torch'):
+        """Bir sonraki isteği profil izleyicisiyle yakalar (tek seferlik)"""
+        if backend not in PROFILER_BACKENDS:
+            raise ValueError(f"Geçersiz profil arka ucu: {backend} ({', '.join(PROFILER_BACKENDS)})")
+        self._profile = (output_dir, backend)
+    
+    def _start_profile(self, engine: str):
+        """Kurulu profil isteği varsa izleyiciyi başlatır; durdurup iz yolunu döndüren fonksiyon"""
+        with self._lock:
+            profile, self._profile = self._profile, None
+        if profile is None:
+            return None
+        output_dir, backend = profile
+        os.makedirs(output_dir, exist_ok=True)
+        
+        if backend == 'tensorflow':
+            import tensorflow as tf
+            tf.profiler.experimental.start(output_dir)
+            
+            def stop_tensorflow():
+                tf.profiler.experimental.stop()
+                logger.info(f"TensorFlow profile written to: {output_dir}")
+                return output_dir
+            return stop_tensorflow
+        
+        import torch
+        profiler = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU],
+                                          record_shapes=True, profile_memory=True)
+        profiler.__enter__()
+        
+        def stop_torch():
+            profiler.__exit__(None, None, None)
+            path = os.path.join(output_dir, f"{engine}-{time.strftime('%Y%m%d-%H%M%S')}.pt.trace.json")
+            profiler.export_chrome_trace(path)
+            logger.info(f"Torch profile written to: {path}")
+            return path
+        return stop_torch
+    
+    def summary(self) -> Dict:
+        """Motor -> aşama -> gecikme/CPU/bellek özeti (JSON)"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            result = {}
+            for (engine, name), histogram in histograms:
+                result.setdefault(engine, {})[name] = histogram.summary()
+        return {'stages': result, 'peak_rss_mb': peak_rss_bytes() / MB}
+    
+    def prometheus(self) -> str:
+        """Prometheus metin biçiminde histogramlar ve CPU sayaçları"""
+        wall = f"{self.namespace}_stage_duration_seconds"
+        cpu = f"{self.namespace}_stage_cpu_seconds_total"
+        rss = f"{self.namespace}_stage_peak_rss_delta_bytes"
+        lines = [f"# HELP {wall} Wall time per analysis stage",
+                 f"# TYPE {wall} histogram"]
+        cpu_lines = [f"# HELP {cpu} Process CPU time spent while the stage ran",
+                     f"# TYPE {cpu} counter"]
+        rss_lines = [f"# HELP {rss} Largest peak RSS increase observed during the stage",
+                     f"# TYPE {rss} gauge"]
+        
+        with self._lock:
+            for (engine, name), histogram in sorted(self._histograms.items()):
+                labels = f'engine="{engine}",stage="{name}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets_s, histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{wall}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{wall}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{wall}_sum{{{labels}}} {histogram.wall_s:.6f}')
+                lines.append(f'{wall}_count{{{labels}}} {histogram.count}')
+                cpu_lines.append(f'{cpu}{{{labels}}} {histogram.cpu_s:.6f}')
+                rss_lines.append(f'{rss}{{{labels}}} {histogram.peak_rss_delta}')
+        
+        peak = f"{self.namespace}_process_peak_rss_bytes"
+        return '\n'.join(lines + cpu_lines + rss_lines + [
+            f"# HELP {peak} Peak resident set size of the process",
+            f"# TYPE {peak} gauge",
+            f"{peak} {peak_rss_bytes()}"
+        ]) + '\n'
+    
+    def write(self, path: str):
+        """Metrikleri dosyaya yazar: .prom/.txt uzantısında Prometheus, aksi halde JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(('.prom', '.txt')):
+                f.write(self.prometheus())
+            else:
+                json.dump(self.summary(), f, indent=2)
+        logger.info(f"Metrics written to: {path}")
+    
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+# Varsayılan süreç geneli ölçüm kaydı
+INSTRUMENTATION = Instrumentation()
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Model içi aşama işaretçisi: yalnızca etkin bir istek izi varsa ölçer"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.instrumentation.stage(trace.engine, name):
+        yield
@@ -520,7 +520,8 @@ class AnomalyDetectionSystem:
             }
         
         # Clustering-based
-        if hasattr(self.models['clustering'], 'normal_clusters'):
+        # DBSCAN tüm örnekleri gürültü sayarsa normal küme yoktur
+        if getattr(self.models['clustering'], 'normal_clusters', None):
             features_scaled = self.scalers['clustering'].transform(features)
             min_distance = min([
                 np.linalg.norm(features_scaled[0] - center) 
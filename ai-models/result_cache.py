@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ReFlow AI Result Cache
+Görüntü içeriği, model ağırlıkları ve parametrelerle adreslenen disk tabanlı sonuç önbelleği
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """Dosya içeriğinin SHA-256 özeti; görüntü çözülmez"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def arrays_digest(named_arrays: Iterable[Tuple[str, np.ndarray]]) -> str:
+    """İsimli ağırlık dizilerinin (ad, şekil, tip ve içerik) SHA-256 özeti"""
+    digest = hashlib.sha256()
+    for name, array in named_arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{name}|{array.shape}|{array.dtype}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+def model_fingerprint(model: Any, *params) -> str:
+    """PyTorch modülü, Keras modeli veya dizi sözlüğünün ağırlıklarından sürüm parmak izi üretir
+    
+    Ek parametreler (eşikler, sınıf adları vb.) parmak izine dahil edilir.
+    """
+    if hasattr(model, 'state_dict'):
+        arrays = ((name, tensor.detach().cpu().numpy())
+                  for name, tensor in sorted(model.state_dict().items()))
+    elif hasattr(model, 'get_weights'):
+        arrays = ((str(i), weight) for i, weight in enumerate(model.get_weights()))
+    elif isinstance(model, dict):
+        arrays = ((str(name), np.asarray(value)) for name, value in sorted(model.items()))
+    else:
+        raise TypeError(f"Parmak izi alınamayan model tipi: {type(model).__name__}")
+    
+    return make_key(arrays_digest(arrays), *params)
+
+def make_key(*parts) -> str:
+    """JSON'a çevrilebilir parçalardan kararlı önbellek anahtarı üretir"""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache:
+    """İçerik adresli, boyut sınırlı ve LRU tahliyeli JSON sonuç önbelleği
+    
+    Girdiler `cache_dir/<namespace>/<anahtarın ilk 2 karakteri>/<anahtar>.json` altında
+    saklanır. Okunan girdinin değişiklik zamanı güncellenir; toplam boyut `max_bytes`
+    değerini aşınca en uzun süredir kullanılmayan girdiler silinir.
+    """
+    
+    def __init__(self, cache_dir: str, max_bytes: int = 1 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size = sum(path.stat().st_size for path in self._entries())
+    
+    def _entries(self) -> Iterable[Path]:
+        return self.cache_dir.glob('*/*/*.json')
+    
+    def _path(self, namespace: str, key: str) -> Path:
+        return self.cache_dir / namespace / key[:2] / f"{key}.json"
+    
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        """Girdiyi döndürür, yoksa None"""
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            # LRU sırası için kullanım zamanını güncelle
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self.hits += 1
+        return value
+    
+    def put(self, namespace: str, key: str, value: Dict):
+        """Girdiyi atomik olarak yazar ve gerekirse tahliye yapar"""
+        path = self._path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        
+        try:
+            previous = path.stat().st_size
+        except FileNotFoundError:
+            previous = 0
+        
+        # Yarım yazılmış dosya okunmasın diye geçici dosya ve rename
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        
+        with self._lock:
+            self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+    
+    def _evict(self):
+        """Boyut sınırın %80'ine inene kadar en eski kullanılan girdileri siler"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        
+        # Diğer süreçlerin yazdıkları da dahil gerçek boyut
+        self._size = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.8)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if self._size <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self._size -= size
+            removed += 1
+        
+        if removed:
+            logger.info(f"Sonuç önbelleğinden {removed} girdi silindi ({self._size / 1e6:.1f} MB)")
+    
+    def stats(self) -> Dict:
+        """İsabet/ıska sayıları ve disk kullanımı"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size_bytes': self._size,
+            'max_bytes': self.max_bytes
+        }
@@ -0,0 +1,47 @@
+"""
+ReFlow AI test yardımcıları
+Küçük rastgele ağırlıklı Keras modeli ve diske yazılmış sentetik görüntüler
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# ai-models modüllerinin doğrudan içe aktarılabilmesi için
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from defect_detection import DefectDetectionModel
+
+class TinyDefectModel(DefectDetectionModel):
+    """Veri artırma katmanları olmayan küçük CNN; çıkarım ve Grad-CAM yolu aynıdır"""
+    
+    def build_model(self):
+        import tensorflow as tf
+        model = tf.keras.Sequential([
+            tf.keras.Input(shape=self.input_shape),
+            tf.keras.layers.Conv2D(4, (3, 3), activation='relu'),
+            tf.keras.layers.GlobalAveragePooling2D(),
+            tf.keras.layers.Dense(len(self.class_names), activation='softmax')
+        ])
+        self.compile_model(model)
+        return model
+
+@pytest.fixture(scope='session')
+def detector():
+    import tensorflow as tf
+    tf.random.set_seed(0)
+    return TinyDefectModel(input_shape=(32, 32, 3))
+
+@pytest.fixture
+def image_paths(tmp_path):
+    """Farklı içerikli beş küçük PNG görüntü"""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"image_{i}.png"
+        cv2.imwrite(str(path), rng.integers(0, 255, (48, 64, 3), dtype=np.uint8))
+        paths.append(str(path))
+    return paths
\ No newline at end of file
@@ -0,0 +1,330 @@
+import threading
+import time
+
+import albumentations as A
+import cv2
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from albumentations.pytorch import ToTensorV2
+from scipy import signal
+from transformers.image_utils import PILImageResampling
+
+from advanced_detection import (ANALYZERS, IMAGENET_MEAN, IMAGENET_STD, SHARED_PREPROCESSOR, TORCH_ANALYZERS,
+                                IntegratedAnalysisEngine, ResNetDefectClassifier, SpectralAnalyzer,
+                                VisionTransformerAnalyzer, YOLOv8DefectDetector)
+from defect_detection import ImageContext
+
+# Rastgele ağırlıklar: testler ağ erişimi gerektirmez
+RANDOM_WEIGHTS = {name: {'pretrained': False} for name in TORCH_ANALYZERS}
+
+def seeded_engine(executor: str, **kwargs) -> IntegratedAnalysisEngine:
+    """Modelleri aynı tohumla sırayla yükler; yürütücüler aynı ağırlıkları kullanır"""
+    engine = IntegratedAnalysisEngine(executor=executor, analyzer_options=RANDOM_WEIGHTS, **kwargs)
+    torch.manual_seed(0)
+    for name in (*TORCH_ANALYZERS, 'spectral'):
+        engine.registry.get(name)
+    return engine
+
+def test_cascade_band_is_validated():
+    with pytest.raises(ValueError):
+        IntegratedAnalysisEngine(executor='serial', cascade_band=(0.6, 0.4))
+
+def test_cascade_yolo_decision_uses_band_upper_edge(image_paths):
+    engine = IntegratedAnalysisEngine(executor='serial', cascade_band=(0.2, 0.4))
+    yolo = [{'defect_type': 'crack', 'confidence': 0.45}]
+    engine._cascade_analyses = lambda context: ({'yolo': yolo}, {'decided_by': 'yolo'})
+    try:
+        report = engine.comprehensive_analysis(image_paths[0], cascade=True)
+    finally:
+        engine.close()
+    
+    assert report['ensemble_prediction']['primary_defect'] == 'crack'
+    assert report['ensemble_prediction']['confidence'] == pytest.approx(0.45)
+
+def test_thread_executor_rejects_differing_torch_budgets():
+    with pytest.raises(ValueError):
+        IntegratedAnalysisEngine(executor='thread', thread_budgets={'yolo': 1, 'resnet': 2, 'vit': 1})
+
+def test_serial_executor_applies_each_model_budget(image_paths):
+    budgets = {'yolo': 1, 'resnet': 2, 'vit': 3, 'spectral': 1}
+    engine = IntegratedAnalysisEngine(executor='serial', thread_budgets=budgets, analyzer_options=RANDOM_WEIGHTS)
+    seen = {}
+    for name, (_, method) in ANALYZERS.items():
+        record = lambda context, name=name: seen.setdefault(name, torch.get_num_threads())
+        setattr(engine.registry.get(name), method, record)
+    threads = torch.get_num_threads()
+    try:
+        engine.run_analyses(image_paths[0])
+    finally:
+        engine.close()
+    
+    assert seen == budgets
+    assert torch.get_num_threads() == threads
+
+def test_parallel_report_matches_serial_report(image_paths):
+    reports = {}
+    for executor in ('serial', 'thread'):
+        engine = seeded_engine(executor)
+        try:
+            reports[executor] = engine.comprehensive_analysis(image_paths[0])
+        finally:
+            engine.close()
+        reports[executor].pop('timestamp')
+    
+    assert reports['thread'] == reports['serial']
+
+def test_stopping_stream_reads_no_extra_frames():
+    detector = YOLOv8DefectDetector(pretrained=False)
+    detector.detect_batch = lambda images: [[] for _ in images]
+    pulled = []
+    
+    def frames():
+        while True:
+            pulled.append(len(pulled))
+            yield len(pulled) - 1, time.perf_counter(), np.zeros((8, 8, 3), dtype=np.uint8)
+    
+    stream = detector.detect_stream(frames(), batch_size=1, max_queue=1, drop_frames=False)
+    assert next(stream)['frame_id'] == 0
+    # İlk kare işlenirken okuyucu bir kareyi kuyruğa koyar, sonrakiyle dolu kuyrukta bekler
+    deadline = time.monotonic() + 10
+    while len(pulled) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stream.close()
+    for thread in threading.enumerate():
+        if thread.name == 'frame-reader':
+            thread.join(10)
+    
+    assert len(pulled) == detector.stream_stats.received == 3
+
+def reference_detections(boxes, scores, confidence_threshold, iou_threshold):
+    """Görüntü ve sınıf başına ayrı NMS, güvene göre azalan sıra (toplu yol öncesi davranış)"""
+    from torchvision.ops import nms
+    best, classes = scores.max(dim=1)
+    candidates = best > confidence_threshold
+    rows = []
+    for class_id in classes[candidates].unique().tolist():
+        selected = torch.nonzero(candidates & (classes == class_id)).flatten()
+        for index in nms(boxes[selected], best[selected], iou_threshold).tolist():
+            rows.append((best[selected[index]].item(), class_id, boxes[selected[index]].tolist()))
+    return sorted(rows, key=lambda row: -row[0])
+
+def test_batched_postprocess_matches_per_image_nms():
+    detector = YOLOv8DefectDetector(pretrained=False)
+    generator = torch.Generator().manual_seed(0)
+    count, anchors, classes = 3, 200, len(detector.class_names)
+    corners = torch.rand(count, anchors, 2, generator=generator) * 500
+    boxes = torch.cat((corners, corners + 20 + torch.rand(count, anchors, 2, generator=generator) * 100), -1)
+    scores = torch.rand(count, anchors, classes, generator=generator) * 0.6
+    # Aynı kutu farklı sınıflarda: sınıflar birbirini bastırmamalı
+    boxes[:, 1] = boxes[:, 0]
+    scores[:, 0], scores[:, 1] = 0.0, 0.0
+    scores[:, 0, 0], scores[:, 1, 1] = 0.95, 0.9
+    
+    identity = (torch.ones(count), torch.zeros(count, 2), torch.full((count, 2), 1000.0))
+    batched = detector._postprocess(boxes, scores, *identity)
+    
+    for i, detections in enumerate(batched):
+        single = detector._postprocess(boxes[i:i + 1], scores[i:i + 1], *(value[i:i + 1] for value in identity))[0]
+        expected = reference_detections(boxes[i], scores[i], detector.confidence_threshold, detector.iou_threshold)
+        
+        assert np.array_equal(detections.xyxy, single.xyxy)
+        assert np.array_equal(detections.confidence, single.confidence)
+        assert np.array_equal(detections.class_id, single.class_id)
+        assert np.all(np.diff(detections.confidence) <= 0)
+        assert detections.class_id.tolist() == [row[1] for row in expected]
+        assert np.allclose(detections.confidence, [row[0] for row in expected])
+        assert np.allclose(detections.xyxy, [row[2] for row in expected])
+        assert {0, 1} <= set(detections.class_id[:2].tolist())
+
+class PooledHead(nn.Module):
+    """Görüntü başına bağımsız, belirlenimci kutu ve skor üreten küçük tespit başlığı
+    
+    Rastgele ağırlıklı YOLO skorları neredeyse sabittir; eşit skorlar arasında NMS sırası
+    tanımsız olduğundan karşılaştırma için ayrışan skorlar gerekir.
+    """
+    
+    def __init__(self, num_classes: int, stride: int = 16):
+        super().__init__()
+        self.stride = stride
+        self.projection = nn.Linear(3, 4 + num_classes)
+    
+    def forward(self, x):
+        pooled = F.avg_pool2d(x, self.stride)
+        ys, xs = torch.meshgrid(torch.arange(pooled.shape[2]) + 0.5, torch.arange(pooled.shape[3]) + 0.5,
+                                indexing='ij')
+        centers = torch.stack((xs, ys), -1).reshape(-1, 2) * self.stride
+        output = self.projection(pooled.flatten(2).transpose(1, 2) * 4 - 2)
+        half = 4 + F.softplus(output[..., :2]) * 20
+        return torch.cat((centers - half, centers + half), -1), output[..., 4:].sigmoid()
+
+def test_detect_batch_matches_per_image_detection():
+    torch.manual_seed(0)
+    detector = YOLOv8DefectDetector(pretrained=False)
+    detector.model = PooledHead(len(detector.class_names)).eval()
+    rng = np.random.default_rng(4)
+    images = [rng.integers(0, 255, shape, dtype=np.uint8) for shape in ((120, 160, 3), (200, 100, 3), (64, 64, 3))]
+    
+    batch = detector.detect_batch(images)
+    
+    assert len(batch) == len(images)
+    for image, detections in zip(images, batch):
+        assert detections and detections == detector.detect_defects(image)
+        assert [d['confidence'] for d in detections] == sorted((d['confidence'] for d in detections), reverse=True)
+
+def assert_same_classification(result, reference):
+    assert result['predicted_class'] == reference['predicted_class']
+    assert result['all_probabilities'].keys() == reference['all_probabilities'].keys()
+    assert result['all_probabilities'] == pytest.approx(reference['all_probabilities'], abs=1e-5)
+
+@pytest.mark.parametrize('num_workers', [0, 1])
+def test_classify_batch_matches_single_classification(image_paths, num_workers):
+    torch.manual_seed(0)
+    classifier = ResNetDefectClassifier(pretrained=False)
+    expected = [classifier.classify_defect(path) for path in image_paths]
+    
+    # batch_size < görüntü sayısı: işçili yolda DataLoader kullanılır
+    results = classifier.classify_batch(image_paths, batch_size=2, num_workers=num_workers)
+    
+    assert len(results) == len(expected)
+    for result, reference in zip(results, expected):
+        assert_same_classification(result, reference)
+
+def test_quantized_classifier_returns_probabilities_for_all_classes(image_paths):
+    torch.manual_seed(0)
+    classifier = ResNetDefectClassifier(pretrained=False, quantized=True, calibration_images=image_paths)
+    
+    results = [classifier.classify_defect(image_paths[0])] + classifier.classify_batch(image_paths, num_workers=0)
+    
+    assert classifier.quantized and classifier.memory_bytes() > 0
+    for result in results:
+        probabilities = result['all_probabilities']
+        assert list(probabilities) == ResNetDefectClassifier.CLASS_NAMES
+        assert all(0.0 <= value <= 1.0 for value in probabilities.values())
+        assert sum(probabilities.values()) == pytest.approx(1.0, abs=1e-4)
+        assert result['predicted_class'] == max(probabilities, key=probabilities.get)
+        assert result['confidence'] == probabilities[result['predicted_class']]
+    assert_same_classification(results[1], results[0])
+
+def test_vit_sdpa_and_eager_attention_give_same_predictions(image_paths):
+    eager = VisionTransformerAnalyzer(with_attention=True, pretrained=False)
+    sdpa = VisionTransformerAnalyzer(with_attention=False, pretrained=False)
+    sdpa.model.load_state_dict(eager.model.state_dict())
+    
+    expected = eager.analyze_batch(image_paths[:3])
+    results = sdpa.analyze_batch(image_paths[:3])
+    
+    assert (eager.model.config._attn_implementation, sdpa.model.config._attn_implementation) == ('eager', 'sdpa')
+    for result, reference in zip(results, expected):
+        assert result['attention_analysis'] is None and reference['attention_analysis'] is not None
+        assert np.allclose(result['predictions'], reference['predictions'], atol=1e-5)
+        assert np.argmax(result['predictions']) == np.argmax(reference['predictions'])
+
+def test_vit_snapshot_round_trip_keeps_head_and_outputs(image_paths, tmp_path):
+    analyzer = VisionTransformerAnalyzer(pretrained=False)
+    expected = analyzer.analyze_batch(image_paths[:2])
+    
+    analyzer.save_snapshot(str(tmp_path / 'vit'))
+    restored = VisionTransformerAnalyzer.from_snapshot(str(tmp_path / 'vit'))
+    
+    assert restored.model.config.num_labels == len(ResNetDefectClassifier.CLASS_NAMES)
+    assert list(restored.model.config.id2label.values()) == ResNetDefectClassifier.CLASS_NAMES
+    assert torch.equal(restored.model.classifier.weight, analyzer.model.classifier.weight)
+    assert restored.analyze_batch(image_paths[:2]) == expected
+
+def test_vit_snapshot_requires_config(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        VisionTransformerAnalyzer.from_snapshot(str(tmp_path))
+
+def baseline_spectrum(image: np.ndarray) -> np.ndarray:
+    """Vektörleştirme öncesi yol: HSV value kanalı, np.histogram ve savgol"""
+    value_channel = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)[:, :, 2]
+    hist, _ = np.histogram(value_channel, bins=100, range=(0, 255))
+    return signal.savgol_filter(hist.astype(float) / np.sum(hist), 5, 2)
+
+def test_spectral_batch_matches_baseline_histogram_path():
+    analyzer = SpectralAnalyzer()
+    rng = np.random.default_rng(5)
+    gradient = np.repeat(np.arange(256, dtype=np.uint8)[None, :, None], 3, axis=2).repeat(4, axis=0)
+    images = [rng.integers(0, 256, (60, 80, 3), dtype=np.uint8), gradient,
+              rng.integers(40, 200, (33, 47, 3), dtype=np.uint8)]
+    
+    results = analyzer.analyze_spectrum_batch(images)
+    
+    for image, result in zip(images, results):
+        spectrum = baseline_spectrum(image)
+        assert np.allclose(result['spectrum'], spectrum, rtol=0, atol=1e-12)
+        for name, reference in analyzer.reference_spectra.items():
+            expected = analyzer._calculate_spectral_similarity(spectrum, reference)
+            assert result['similarity_scores'][name] == pytest.approx(expected, abs=1e-12)
+        assert result['predicted_composition'] == pytest.approx(analyzer._predict_composition(spectrum))
+        assert result['quality_indicators'] == pytest.approx(analyzer._analyze_quality_indicators(spectrum))
+
+@pytest.mark.parametrize('shape', [(48, 64), (224, 224), (600, 800)])
+def test_shared_inputs_match_reference_preprocessors(shape):
+    # Doğal görüntü benzeri, yüksek frekansı sınırlı içerik (224'e göre ~2 piksel bulanıklık)
+    noise = np.random.default_rng(6).integers(0, 256, (*shape, 3), dtype=np.uint8)
+    context = ImageContext(image=cv2.GaussianBlur(noise, (0, 0), max(shape) / 224 * 2))
+    vit = VisionTransformerAnalyzer(pretrained=False)
+    
+    resnet = SHARED_PREPROCESSOR.normalized(context, IMAGENET_MEAN, IMAGENET_STD)
+    vit_input = SHARED_PREPROCESSOR.normalized(context, vit.processor.image_mean, vit.processor.image_std)
+    
+    # ResNet: albumentations aynı cv2 bilinear ölçeklemeyi kullanır
+    albumentations = A.Compose([A.Resize(224, 224), A.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD), ToTensorV2()])
+    assert torch.allclose(resnet, albumentations(image=context.rgb)['image'], atol=1e-5)
+    # ViT: PIL bilinear yuvarlama ve küçültmedeki kenar yumuşatma birkaç gri seviye fark verir
+    assert vit._shared_input
+    difference = (vit_input - vit.processor(images=[context.rgb], return_tensors='pt')['pixel_values'][0]).abs()
+    assert difference.max().item() <= 3 / 255 / 0.5
+    assert difference.mean().item() <= 0.005
+
+def test_vit_processor_with_other_resampling_skips_shared_input():
+    analyzer = VisionTransformerAnalyzer(pretrained=False)
+    analyzer.processor.resample = PILImageResampling.BICUBIC
+    
+    assert not analyzer._processor_matches_shared()
+
+def baseline_ensemble(yolo_results, resnet_results):
+    """Kademeli mod öncesi ensemble: > 0.5 YOLO çoğunluğu, yoksa ResNet"""
+    main_defects = [d['defect_type'] for d in yolo_results if d['confidence'] > 0.5]
+    if main_defects:
+        primary_defect = max(set(main_defects), key=main_defects.count)
+        confidence = np.mean([d['confidence'] for d in yolo_results if d['defect_type'] == primary_defect])
+    else:
+        primary_defect, confidence = resnet_results['predicted_class'], resnet_results['confidence']
+    if not yolo_results:
+        agreement = 0.5
+    else:
+        agreement = 1.0 if resnet_results['predicted_class'] in {d['defect_type'] for d in yolo_results} else 0.3
+    return {
+        'primary_defect': primary_defect,
+        'confidence': float(confidence),
+        'detection_count': len(yolo_results),
+        'model_agreement': agreement
+    }
+
+@pytest.mark.parametrize('yolo', [
+    [],
+    # Tam 0.5 güven YOLO kararına sayılmaz
+    [{'defect_type': 'crack', 'confidence': 0.5}],
+    [{'defect_type': 'void', 'confidence': 0.7}, {'defect_type': 'void', 'confidence': 0.6},
+     {'defect_type': 'crack', 'confidence': 0.9}],
+])
+def test_non_cascade_report_matches_baseline_ensemble(image_paths, yolo):
+    resnet = {'predicted_class': 'porosity', 'confidence': 0.55,
+              'all_probabilities': {name: 0.0 for name in ResNetDefectClassifier.CLASS_NAMES}}
+    # ViT güçlü biçimde başka bir sınıfı seçer; kademesiz raporu etkilememeli
+    vit = {'predictions': [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0], 'attention_analysis': None,
+           'feature_importance': {}}
+    engine = IntegratedAnalysisEngine(executor='serial')
+    engine.run_analyses = lambda image, analyses=None: {'yolo': yolo, 'resnet': resnet, 'vit': vit}
+    try:
+        report = engine.comprehensive_analysis(image_paths[0])
+    finally:
+        engine.close()
+    
+    assert report['ensemble_prediction'] == baseline_ensemble(yolo, resnet)
+    assert report['recommendations'] == engine._generate_recommendations(baseline_ensemble(yolo, resnet))
\ No newline at end of file
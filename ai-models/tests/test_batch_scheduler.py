@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from batch_scheduler import MicroBatcher
+
+def test_wait_counts_from_first_request_queue_time():
+    calls = []
+    
+    def batch_fn(items):
+        calls.append((time.perf_counter(), list(items)))
+        time.sleep(0.3)
+        return items
+    
+    async def run():
+        batcher = MicroBatcher('test', batch_fn, max_batch_size=8, max_wait_ms=300)
+        try:
+            first = asyncio.create_task(batcher.submit('a'))
+            await asyncio.sleep(0.35)
+            # Önceki yığın çalışırken gelen istek o yığın bitince hemen işlenmeli
+            second_queued = time.perf_counter()
+            assert await batcher.submit('b') == 'b'
+            assert await first == 'a'
+            return second_queued
+        finally:
+            await batcher.stop()
+    
+    second_queued = asyncio.run(run())
+    
+    assert [items for _, items in calls] == [['a'], ['b']]
+    assert calls[1][0] - second_queued < 0.3 + 0.1
+
+def test_stop_cancels_queued_and_inflight_requests_and_restarts():
+    release = threading.Event()
+    
+    def batch_fn(items):
+        release.wait(5)
+        return items
+    
+    async def run():
+        batcher = MicroBatcher('test', batch_fn, max_batch_size=1, max_wait_ms=0)
+        inflight = asyncio.create_task(batcher.submit('a'))
+        queued = asyncio.create_task(batcher.submit('b'))
+        await asyncio.sleep(0.1)
+        await batcher.stop()
+        results = await asyncio.wait_for(asyncio.gather(inflight, queued, return_exceptions=True), 1)
+        release.set()
+        
+        # Durdurulan yığınlayıcı yeni yürütücüyle yeniden kullanılabilir
+        try:
+            restarted = await asyncio.wait_for(batcher.submit('c'), 5)
+        finally:
+            await batcher.stop()
+        return results, restarted
+    
+    results, restarted = asyncio.run(run())
+    
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert restarted == 'c'
+
+def test_result_count_mismatch_fails_requests():
+    async def run():
+        batcher = MicroBatcher('test', lambda items: items[:-1], max_batch_size=2, max_wait_ms=50)
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.submit('a'), batcher.submit('b'), return_exceptions=True), 5)
+        finally:
+            await batcher.stop()
+    
+    results = asyncio.run(run())
+    
+    assert all(isinstance(result, RuntimeError) for result in results)
\ No newline at end of file
@@ -0,0 +1,170 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from defect_detection import AUGMENTATION_LAYERS, DefectDetectionModel, ImageContext, analyze_batch, analyze_image
+from result_cache import ResultCache
+
+def test_analyze_batch_keeps_input_order_with_failures(detector, image_paths, tmp_path):
+    missing = str(tmp_path / 'missing.png')
+    paths = image_paths[:2] + [missing] + image_paths[2:] + [missing]
+    
+    results = list(analyze_batch(detector, paths, batch_size=8, workers=2))
+    
+    assert [result['image_path'] for result in results] == paths
+    assert ['error' in result for result in results] == [path == missing for path in paths]
+
+def test_analyze_batch_failures_do_not_shrink_inference_batches(detector, image_paths, tmp_path):
+    missing = str(tmp_path / 'missing.png')
+    paths = [missing, image_paths[0], missing, image_paths[1], image_paths[2]]
+    
+    results = list(analyze_batch(detector, paths, batch_size=2, workers=1))
+    
+    assert [result['image_path'] for result in results] == paths
+    assert all('detections' in result for result in results if result['image_path'] != missing)
+
+def test_class_activation_maps_traced_once_for_any_tile_count(detector):
+    for tiles in (1, 3, 6, 2):
+        predictions, cams = detector.predict_batch_with_cam(np.zeros((tiles, 32, 32, 3), dtype=np.float32))
+        assert cams.shape[:2] == (tiles, len(detector.class_names))
+    
+    _, class_activation_maps = detector._cam_functions()
+    assert class_activation_maps.experimental_get_tracing_count() == 1
+
+def test_threshold_change_reuses_cached_raw_outputs(detector, image_paths, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    image_path = image_paths[0]
+    
+    first = analyze_image(detector, image_path, threshold=0.3, cache=cache)
+    repeated = analyze_image(detector, image_path, threshold=0.3, cache=cache)
+    changed = analyze_image(detector, image_path, threshold=0.1, cache=cache)
+    fresh = analyze_image(detector, image_path, threshold=0.1)
+    
+    assert first['timing']['cache'] == 'miss'
+    assert repeated['timing']['cache'] == 'report'
+    assert changed['timing']['cache'] == 'raw'
+    assert 'decode' not in changed['timing']['stages']
+    assert changed['detections'] == fresh['detections']
+    assert repeated['detections'] == first['detections']
+
+def test_analyze_batch_skips_inference_for_cached_images(detector, image_paths, tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    first = list(analyze_batch(detector, image_paths, cache=cache))
+    
+    calls = []
+    predict = detector.predict_batch_with_cam
+    detector.predict_batch_with_cam = lambda images: calls.append(len(images)) or predict(images)
+    try:
+        second = list(analyze_batch(detector, image_paths, threshold=0.1, cache=cache))
+    finally:
+        del detector.predict_batch_with_cam
+    
+    assert calls == []
+    assert [result['image_path'] for result in second] == [result['image_path'] for result in first]
+
+def test_quality_batch_matches_single_image_analysis(detector, image_paths):
+    rng = np.random.default_rng(1)
+    images = image_paths + [ImageContext(image=rng.integers(0, 255, (40, 40, 3), dtype=np.uint8))]
+    
+    expected = [detector.analyze_image_quality(image) for image in images]
+    batch = detector.analyze_image_quality_batch(images)
+    
+    assert len(batch) == len(expected)
+    for result, reference in zip(batch, expected):
+        assert result.keys() == reference.keys()
+        for key in reference:
+            assert result[key] == pytest.approx(reference[key], rel=1e-9, abs=1e-9)
+
+def test_quality_batch_stride_stays_within_sampling_bound(detector):
+    rng = np.random.default_rng(2)
+    images = rng.integers(0, 255, (3, 256, 256, 3), dtype=np.uint8)
+    stride = 4
+    
+    expected = [detector.analyze_image_quality(ImageContext(image=image)) for image in images]
+    batch = detector.analyze_image_quality_batch(images, sample_stride=stride)
+    
+    n = (256 // stride) ** 2
+    for result, reference, image in zip(batch, expected, images):
+        gray = ImageContext(image=image).gray
+        assert abs(result['brightness'] - reference['brightness']) <= 3 * gray.std() / np.sqrt(n)
+        assert abs(result['uv_intensity'] - reference['uv_intensity']) <= 3 * image[:, :, 0].std() / np.sqrt(n)
+
+def test_default_model_builds_with_augmentation_excluded_from_inference():
+    model = DefectDetectionModel(input_shape=(64, 64, 3))
+    
+    assert sum(isinstance(layer, AUGMENTATION_LAYERS) for layer in model.model.layers) == 3
+    assert not any(isinstance(layer, AUGMENTATION_LAYERS) for layer in model.inference_model.layers)
+    predictions, cams = model.predict_batch_with_cam(np.zeros((2, 64, 64, 3), dtype=np.float32))
+    assert predictions.shape == (2, len(model.class_names))
+    assert cams.shape[:2] == (2, len(model.class_names))
+
+def test_tiled_boxes_are_in_original_image_coordinates(detector):
+    rng = np.random.default_rng(3)
+    image = np.zeros((128, 192, 3), dtype=np.uint8)
+    image[40:56, 100:116] = rng.integers(180, 255, (16, 16, 3), dtype=np.uint8)
+    context = ImageContext(image=image)
+    
+    tiles, skipped = detector.plan_tiles(context, overlap=0.5)
+    covered = np.zeros(image.shape[:2], dtype=bool)
+    for x, y, tw, th in tiles:
+        assert (tw, th) == (32, 32) and x + tw <= 192 and y + th <= 128
+        assert image[y:y + th, x:x + tw].any()
+        covered[y:y + th, x:x + tw] = True
+    assert covered[40:56, 100:116].all()
+    assert skipped > 0
+    
+    # Model yerine karonun parlaklığı: aktivasyon tam olarak parlak bölgede, bölgeyi
+    # tümüyle içeren karo en güvenlisi
+    def predict_batch_with_cam(images):
+        cams = np.stack([cv2.resize(tile.mean(axis=2), (8, 8), interpolation=cv2.INTER_AREA) for tile in images])
+        cams = np.repeat(cams[:, None], len(detector.class_names), axis=1)
+        crack = 0.5 + images.mean(axis=(1, 2, 3))
+        rest = (1 - crack)[:, None] / 3
+        return np.column_stack([crack, rest, rest, rest]), cams
+    
+    detector.predict_batch_with_cam = predict_batch_with_cam
+    try:
+        raw = detector.predict_raw_tiled(context, overlap=0.5)
+        detections = detector.detections_from_raw(raw, confidence_threshold=0.3)
+    finally:
+        del detector.predict_batch_with_cam
+    
+    assert [tuple(tile) for tile in raw['tiles']] == tiles
+    for (tx, ty, tw, th), boxes in zip(raw['tiles'], raw['boxes']):
+        x, y, w, h = boxes[0]
+        assert tx <= x and x + w <= tx + tw and ty <= y and y + h <= ty + th
+        assert 100 <= x and x + w <= 116 and 40 <= y and y + h <= 56
+    
+    expected = {'x': 100, 'y': 40, 'width': 16, 'height': 16, 'center_x': 108, 'center_y': 48}
+    crack = next(detection for detection in detections if detection['defect_type'] == 'crack')
+    assert crack['location'] == expected
+    assert crack['regions'] == [expected]
+
+def test_image_context_views_lock_per_key():
+    context = ImageContext(image=np.zeros((8, 8, 3), dtype=np.uint8))
+    started, release = threading.Event(), threading.Event()
+    calls = []
+    
+    def slow():
+        calls.append('slow')
+        started.set()
+        release.wait(10)
+        return 'slow'
+    
+    threads = [threading.Thread(target=context.view, args=('slow', slow)) for _ in range(3)]
+    threads[0].start()
+    started.wait(10)
+    for thread in threads[1:]:
+        thread.start()
+    
+    # Başka bir görünüm, üretimi süren görünümü beklemez
+    assert context.view('fast', lambda: 'fast') == 'fast'
+    assert context.rgb.shape == (8, 8, 3)
+    release.set()
+    for thread in threads:
+        thread.join(10)
+    
+    assert calls == ['slow']
+    assert context.view('slow', slow) == 'slow'
\ No newline at end of file
@@ -0,0 +1,76 @@
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from instrumentation import Instrumentation, current_trace, stage
+
+def test_nested_request_reuses_outer_trace():
+    instrumentation = Instrumentation()
+    
+    with instrumentation.request('outer') as outer:
+        with instrumentation.request('inner') as inner:
+            assert inner is outer
+            assert current_trace() is outer
+            with stage('decode'):
+                pass
+    
+    assert current_trace() is None
+    assert outer.engine == 'outer'
+    assert outer.stages['decode']['calls'] == 1
+    stages = instrumentation.summary()['stages']
+    assert list(stages) == ['outer']
+    assert stages['outer']['total']['count'] == 1
+
+def test_stage_timings_land_in_histograms():
+    instrumentation = Instrumentation()
+    
+    # Etkin istek yokken model içi aşamalar ölçülmez
+    with stage('preprocess'):
+        pass
+    assert instrumentation.summary()['stages'] == {}
+    
+    with instrumentation.request('engine') as trace:
+        for _ in range(2):
+            with stage('inference'):
+                time.sleep(0.01)
+        # İş parçacığına taşınan iz aynı isteğe yazar
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(contextvars.copy_context().run, instrumentation.record, 'engine', 'yolo', 5.0).result()
+    
+    stages = instrumentation.summary()['stages']['engine']
+    assert stages['inference']['count'] == 2
+    assert stages['inference']['p50_ms'] >= 10.0
+    assert stages['yolo']['count'] == 1 and stages['yolo']['max_ms'] == pytest.approx(5.0)
+    assert trace.stages['inference']['calls'] == 2
+    assert trace.stages['inference']['wall_ms'] >= 20.0
+    assert trace.stages['yolo']['wall_ms'] == pytest.approx(5.0)
+    assert stages['total']['max_ms'] >= trace.stages['inference']['wall_ms']
+
+def test_prometheus_output_format():
+    instrumentation = Instrumentation(namespace='test', buckets_s=(0.01, 0.1, 1.0))
+    for wall_ms in (5.0, 50.0, 60.0, 5000.0):
+        instrumentation.observe('engine', 'inference', wall_ms, cpu_ms=wall_ms / 2)
+    
+    text = instrumentation.prometheus()
+    lines = text.splitlines()
+    
+    assert text.endswith('\n')
+    sample = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? [0-9.e+-]+$')
+    for line in lines:
+        assert line.startswith('# HELP ') or line.startswith('# TYPE ') or sample.match(line), line
+    assert '# TYPE test_stage_duration_seconds histogram' in lines
+    assert '# TYPE test_stage_cpu_seconds_total counter' in lines
+    assert '# TYPE test_process_peak_rss_bytes gauge' in lines
+    
+    labels = 'engine="engine",stage="inference"'
+    # Kovalar birikimlidir; +Inf kovası toplam sayıdır
+    assert f'test_stage_duration_seconds_bucket{{{labels},le="0.01"}} 1' in lines
+    assert f'test_stage_duration_seconds_bucket{{{labels},le="0.1"}} 3' in lines
+    assert f'test_stage_duration_seconds_bucket{{{labels},le="1"}} 3' in lines
+    assert f'test_stage_duration_seconds_bucket{{{labels},le="+Inf"}} 4' in lines
+    assert f'test_stage_duration_seconds_sum{{{labels}}} 5.115000' in lines
+    assert f'test_stage_duration_seconds_count{{{labels}}} 4' in lines
+    assert f'test_stage_cpu_seconds_total{{{labels}}} 2.557500' in lines
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import signal
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from worker_pool import WorkerCrashedError, WorkerPool
+
+KIND = 'spectral'
+METHOD = 'analyze_spectrum'
+
+@pytest.fixture
+def images():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (240, 320, 3), dtype=np.uint8) for _ in range(3)]
+
+def freeze_worker(pool: WorkerPool) -> int:
+    """İşçiyi durdurur (SIGSTOP); gönderilen görevler işçide beklemede kalır"""
+    pid = pool.health()['workers'][KIND][0]['pid']
+    os.kill(pid, signal.SIGSTOP)
+    return pid
+
+def test_crashed_worker_restarts_and_retries_inflight_tasks(images):
+    with WorkerPool({KIND: 1}, slots=4, slot_mb=1) as pool:
+        expected = [pool.submit(KIND, METHOD, image).result()[0] for image in images]
+        
+        pid = freeze_worker(pool)
+        futures = [pool.submit(KIND, METHOD, image) for image in images]
+        os.kill(pid, signal.SIGKILL)
+        results = [future.result(timeout=300)[0] for future in futures]
+        worker = pool.health()['workers'][KIND][0]
+    
+    assert results == expected
+    assert worker['restarts'] == 1
+    assert worker['pid'] != pid
+
+def test_stuck_task_fails_after_retries_and_worker_recovers(images):
+    with WorkerPool({KIND: 1}, task_timeout_s=1, max_retries=0, health_interval_s=0.2) as pool:
+        freeze_worker(pool)
+        with pytest.raises(WorkerCrashedError):
+            pool.submit(KIND, METHOD, images[0]).result(timeout=60)
+        
+        pool.wait_ready(300)
+        assert pool.submit(KIND, METHOD, images[0]).result(timeout=60)[0]
+        assert pool.health()['workers'][KIND][0]['restarts'] == 1
+
+def test_startup_failure_stops_started_workers_and_frees_shared_memory(monkeypatch):
+    started = []
+    start = WorkerPool._start
+    
+    def failing_start(pool, worker):
+        if started:
+            raise OSError('spawn failed')
+        start(pool, worker)
+        started.append((worker.process, pool.ring.name))
+    
+    monkeypatch.setattr(WorkerPool, '_start', failing_start)
+    with pytest.raises(OSError):
+        WorkerPool({KIND: 2})
+    
+    process, ring_name = started[0]
+    assert not process.is_alive()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=ring_name)
+
+def test_submit_times_out_when_ring_is_full_and_ping_skips_failed_workers(images):
+    with WorkerPool({KIND: 1}, slots=1, slot_mb=1, acquire_timeout_s=0.5) as pool:
+        assert pool.ping() == {KIND: [True]}
+        worker = pool._workers[KIND][0]
+        worker.failed = 'test'
+        assert pool.ping(timeout=1) == {KIND: [False]}
+        worker.failed = None
+        
+        pid = freeze_worker(pool)
+        pending = pool.submit(KIND, METHOD, images[0])
+        with pytest.raises(TimeoutError):
+            pool.submit(KIND, METHOD, images[1])
+        os.kill(pid, signal.SIGCONT)
+        assert pending.result(timeout=60)[0]
+        assert pool.submit(KIND, METHOD, images[1]).result(timeout=60)[0]
\ No newline at end of file
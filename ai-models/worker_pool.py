@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+"""
+ReFlow AI Worker Pool
+Her işçi sürecin kendi sıcak modelini tuttuğu, görüntülerin paylaşımlı bellek halkasıyla taşındığı süreç havuzu
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import count
+from multiprocessing import connection, shared_memory
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# defect_detection.DefectDetectionModel; diğer türler advanced_detection.ANALYZERS adlarıdır
+DEFECT_KIND = 'defect'
+
+class WorkerCrashedError(RuntimeError):
+    """İşçi süreç görev sırasında çöktü ya da zaman aşımına uğradı (yeniden denemeler dahil)"""
+
+class SharedImageRing:
+    """Sabit boyutlu yuvalara bölünmüş tek paylaşımlı bellek bloğu
+    
+    Ana süreç boş yuvayı alır, görüntüyü yazar ve işçiye yalnızca (yuva, şekil, dtype)
+    gönderir; işçi aynı bloğa bağlanıp görüntüyü kopyalamadan okur. Yuva sonuç gelince
+    serbest kalır, tüm yuvalar doluysa gönderen en fazla `acquire` zaman aşımı kadar bekler.
+    """
+    
+    def __init__(self, slots: int, slot_bytes: int, name: str = None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        elif sys.version_info >= (3, 13):
+            # Blok ana sürecindir; silinmesini yalnızca ana sürecin kaydı yönetir
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # spawn ile başlayan işçi ana sürecin kaynak izleyicisini paylaşır; izleyici adları
+            # küme olarak tuttuğundan bağlanırken yapılan kayıt etkisizdir. Kaydı silmek ana
+            # sürecin kaydını da düşürür, bu yüzden işçi kaydı silmez.
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._free = queue.Queue()
+        if self.owner:
+            for slot in range(slots):
+                self._free.put(slot)
+    
+    @property
+    def name(self) -> str:
+        return self.shm.name
+    
+    def free_slots(self) -> int:
+        return self._free.qsize()
+    
+    def acquire(self, timeout: float = None) -> int:
+        """Boş yuva; `timeout` saniyede yuva boşalmazsa TimeoutError"""
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"{timeout} sn içinde boş halka yuvası bulunamadı") from None
+    
+    def release(self, slot: int):
+        self._free.put(slot)
+    
+    def view(self, slot: int, shape: Tuple[int, ...], dtype: str) -> np.ndarray:
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+    
+    def write(self, slot: int, image: np.ndarray) -> Tuple[int, Tuple[int, ...], str]:
+        """Görüntüyü yuvaya kopyalar; işçiye gönderilecek başvuruyu döndürür"""
+        self.view(slot, image.shape, image.dtype)[...] = image
+        return slot, image.shape, image.dtype.str
+    
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def _build_model(kind: str, options: Dict, threads: int):
+    """İşçi süreçte modeli iş parçacığı bütçesiyle kurar"""
+    import cv2
+    cv2.setNumThreads(threads)
+    if kind == DEFECT_KIND:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+        from defect_detection import DefectDetectionModel
+        return DefectDetectionModel(**options)
+    
+    import torch
+    torch.set_num_threads(threads)
+    from advanced_detection import ANALYZERS
+    return ANALYZERS[kind][0](**options)
+
+def _call_model(kind: str, model, method: str, image, args: Tuple):
+    from defect_detection import ImageContext, analyze_context
+    
+    if method == 'ping':
+        return os.getpid()
+    if method == 'fingerprint':
+        return model.weights_fingerprint() if kind == DEFECT_KIND else model.fingerprint()
+    if method == 'memory_bytes':
+        if kind == DEFECT_KIND:
+            return sum(int(np.prod(w.shape)) * w.dtype.size for w in getattr(model.model, 'weights', []))
+        from advanced_detection import model_memory_bytes
+        return model_memory_bytes(model)
+    
+    context = ImageContext(image=image)
+    if kind == DEFECT_KIND and method == 'analyze':
+        return analyze_context(model, context, None, *args)
+    return getattr(model, method)(context, *args)
+
+def _worker_main(kind: str, options: Dict, threads: int, ring_name: str, slots: int, slot_bytes: int,
+                 conn: connection.Connection):
+    """İşçi süreç döngüsü: model bir kez kurulur, görevler bağlantıdan alınıp sonuçlar geri yazılır"""
+    # Ctrl+C ana sürece aittir; işçiler close() ile durdurulur
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        model = _build_model(kind, options or {}, threads)
+        ring = SharedImageRing(slots, slot_bytes, ring_name)
+    except Exception as e:
+        conn.send(('failed', None, f"{type(e).__name__}: {e}"))
+        return
+    conn.send(('ready', None, os.getpid()))
+    
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        
+        task_id, method, image, args = message
+        start = time.perf_counter()
+        try:
+            if isinstance(image, tuple):
+                image = ring.view(*image)
+            result = _call_model(kind, model, method, image, args)
+            reply = ('done', task_id, (result, (time.perf_counter() - start) * 1000))
+        except Exception as e:
+            reply = ('error', task_id, e)
+        # Yuvaya bakan görünüm, ana süreç yuvayı yeniden kullanmadan bırakılmalı
+        image = None
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # Örn. pickle edilemeyen istisna
+            conn.send(('error', task_id, RuntimeError(f"{type(e).__name__}: {e}")))
+
+class _Task:
+    __slots__ = ('id', 'kind', 'method', 'image', 'args', 'future', 'slot', 'attempts', 'sent_at')
+    
+    def __init__(self, task_id: int, kind: str, method: str, args: Tuple):
+        self.id = task_id
+        self.kind = kind
+        self.method = method
+        self.image = None
+        self.args = args
+        self.future = Future()
+        self.slot = None
+        self.attempts = 0
+        self.sent_at = None
+
+class _Worker:
+    """Bir işçi sürecin durumu; yeniden başlatmada süreç ve bağlantı yenilenir"""
+    
+    def __init__(self, kind: str, index: int):
+        self.kind = kind
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.inflight = {}
+        self.ready = threading.Event()
+        self.failed = None
+        self.pid = None
+        self.completed = 0
+        self.restarts = 0
+        self.last_seen = None
+
+class PoolAnalyzer:
+    """Havuzdaki bir model türü için ProcessAnalyzer ile aynı arayüze sahip vekil"""
+    
+    def __init__(self, pool: 'WorkerPool', kind: str):
+        self.pool = pool
+        self.kind = kind
+    
+    def submit(self, method: str, image=None, *args) -> Future:
+        return self.pool.submit(self.kind, method, image, *args)
+    
+    def fingerprint(self) -> str:
+        return self.submit('fingerprint').result()[0]
+    
+    def memory_bytes(self) -> int:
+        return self.submit('memory_bytes').result()[0]
+    
+    def close(self):
+        # Süreçler havuza aittir; WorkerPool.close ile kapanır
+        pass
+
+class WorkerPool:
+    """Model türü başına sıcak modelli işçi süreçler
+    
+    `workers` tür başına süreç sayısıdır, ör. {'defect': 2, 'resnet': 1}. Görevler türün en
+    az yüklü işçisine gider; görüntüler `SharedImageRing` yuvalarıyla taşınır, yuvaya
+    sığmayanlar pickle ile gönderilir. Çöken ya da `task_timeout_s` süresini aşan işçi
+    yeniden başlatılır ve üzerindeki görevler `max_retries` kez başka işçide denenir.
+    Tüm yuvalar doluysa `submit` en fazla `acquire_timeout_s` (varsayılan `task_timeout_s`)
+    bekler, sonra TimeoutError verir. Future sonucu (sonuç, süre_ms) çiftidir.
+    """
+    
+    def __init__(self, workers: Dict[str, int], options: Dict[str, Dict] = None,
+                 threads: Dict[str, int] = None, slots: int = None, slot_mb: float = 64,
+                 task_timeout_s: float = 300.0, max_retries: int = 1, health_interval_s: float = 1.0,
+                 start_timeout_s: float = 600.0, acquire_timeout_s: float = None):
+        self.options = options or {}
+        self.threads = threads or {}
+        self.task_timeout_s = task_timeout_s
+        self.acquire_timeout_s = task_timeout_s if acquire_timeout_s is None else acquire_timeout_s
+        self.max_retries = max_retries
+        self.health_interval_s = health_interval_s
+        self.ring = SharedImageRing(slots or 2 * sum(workers.values()), int(slot_mb * MB))
+        self._mp = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        self._task_ids = count()
+        self._closed = False
+        self._warned_oversize = False
+        self._workers = {kind: [_Worker(kind, i) for i in range(n)] for kind, n in workers.items()}
+        self._collector = None
+        self._monitor = None
+        # Başlatma yarıda kalırsa başlamış işçiler durdurulur ve paylaşımlı bellek silinir
+        try:
+            for worker in self._all_workers():
+                self._start(worker)
+        
+            self._collector = threading.Thread(target=self._collect, name='pool-collector', daemon=True)
+            self._monitor = threading.Thread(target=self._watch, name='pool-monitor', daemon=True)
+            self._collector.start()
+            self._monitor.start()
+            self.wait_ready(start_timeout_s)
+        except BaseException:
+            self.close()
+            raise
+    
+    def _all_workers(self) -> List[_Worker]:
+        return [worker for workers in self._workers.values() for worker in workers]
+    
+    def _start(self, worker: _Worker):
+        parent, child = self._mp.Pipe()
+        threads = self.threads.get(worker.kind, 1)
+        process = self._mp.Process(
+            target=_worker_main, name=f"worker-{worker.kind}-{worker.index}", daemon=True,
+            args=(worker.kind, self.options.get(worker.kind), threads, self.ring.name,
+                  self.ring.slots, self.ring.slot_bytes, child)
+        )
+        try:
+            process.start()
+        except BaseException:
+            parent.close()
+            raise
+        finally:
+            child.close()
+        worker.process = process
+        worker.conn = parent
+        worker.ready.clear()
+        worker.pid = worker.process.pid
+        worker.last_seen = time.monotonic()
+    
+    def wait_ready(self, timeout: float = None):
+        """Tüm işçilerin modeli yüklemesini bekler"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._all_workers():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            while not worker.ready.wait(min(remaining, 0.1) if remaining is not None else 0.1):
+                if worker.failed:
+                    raise RuntimeError(f"{worker.kind} işçisi başlatılamadı: {worker.failed}")
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"{worker.kind} işçisi {timeout} sn içinde hazır olmadı")
+    
+    def analyzer(self, kind: str) -> PoolAnalyzer:
+        return PoolAnalyzer(self, kind)
+    
+    def submit(self, kind: str, method: str, image: np.ndarray = None, *args) -> Future:
+        """Görevi türün işçisine gönderir; (sonuç, süre_ms) döndüren future"""
+        if self._closed:
+            raise RuntimeError('WorkerPool kapatıldı')
+        if kind not in self._workers:
+            raise ValueError(f"Havuzda olmayan model: {kind} ({', '.join(self._workers)})")
+        
+        task = _Task(next(self._task_ids), kind, method, args)
+        task.future.set_running_or_notify_cancel()
+        if image is not None:
+            image = np.asarray(image)
+            if image.nbytes <= self.ring.slot_bytes:
+                task.slot = self.ring.acquire(self.acquire_timeout_s)
+                task.image = self.ring.write(task.slot, image)
+            else:
+                if not self._warned_oversize:
+                    logger.warning(f"Image of {image.nbytes / MB:.0f} MB exceeds ring slot "
+                                   f"({self.ring.slot_bytes / MB:.0f} MB), falling back to pickling")
+                    self._warned_oversize = True
+                task.image = image
+        self._dispatch(task)
+        return task.future
+    
+    def imap(self, kind: str, method: str, images: Iterable, *args,
+             decode_workers: int = 2) -> Iterator[Tuple[Any, Future]]:
+        """Görüntüleri (yol ya da dizi) sırayla gönderir, (girdi, future) çiftlerini sırayla üretir
+        
+        Yollar iş parçacıklarında çözülür; en fazla halka yuvası kadar görüntü beklemede kalır.
+        """
+        from defect_detection import ImageContext
+        
+        def send(image) -> Future:
+            try:
+                bgr = ImageContext(image_path=image).bgr if isinstance(image, str) else image
+                return self.submit(kind, method, bgr, *args)
+            except Exception as e:
+                future = Future()
+                future.set_exception(e)
+                return future
+        
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix='pool-decode') as decoder:
+            for image in images:
+                pending.append((image, decoder.submit(send, image)))
+                if len(pending) >= self.ring.slots:
+                    image, sent = pending.popleft()
+                    yield image, sent.result()
+            while pending:
+                image, sent = pending.popleft()
+                yield image, sent.result()
+    
+    def _dispatch(self, task: _Task, worker: _Worker = None):
+        with self._lock:
+            if worker is None:
+                candidates = [w for w in self._workers[task.kind] if not w.failed]
+                if not candidates:
+                    self._finish(task, error=RuntimeError(f"{task.kind} için çalışan işçi yok"))
+                    return
+                # Hazır olan ve kuyruğu kısa olan işçi tercih edilir
+                worker = min(candidates, key=lambda w: (not w.ready.is_set(), len(w.inflight)))
+            task.sent_at = time.monotonic()
+            worker.inflight[task.id] = task
+            conn = worker.conn
+        
+        try:
+            with worker.send_lock:
+                conn.send((task.id, task.method, task.image, task.args))
+        except (OSError, ValueError):
+            # Süreç ölmüş; toplayıcı yeniden başlatır ve görevi yeniden dener
+            pass
+    
+    def _finish(self, task: _Task, result=None, error: BaseException = None):
+        if task.slot is not None:
+            self.ring.release(task.slot)
+            task.slot = None
+        if error is not None:
+            task.future.set_exception(error)
+        else:
+            task.future.set_result(result)
+    
+    def _collect(self):
+        """Sonuçları okur; bağlantısı kopan ya da süreci biten işçiyi yeniden başlatır"""
+        while not self._closed:
+            with self._lock:
+                owners = {}
+                for worker in self._all_workers():
+                    if worker.failed:
+                        continue
+                    owners[worker.conn] = worker
+                    owners[worker.process.sentinel] = worker
+            
+            for ready in connection.wait(list(owners), timeout=0.2):
+                worker = owners[ready]
+                if worker.conn is not ready and worker.process.sentinel is not ready:
+                    continue  # Bu turda yeniden başlatıldı
+                if ready is worker.process.sentinel:
+                    # Süreç bitmeden önce yazdığı sonuçlar okunur
+                    while not self._closed and self._drain(worker, block=False):
+                        pass
+                    worker.process.join(timeout=5)
+                    self._restart(worker, f"exit code {worker.process.exitcode}")
+                    continue
+                self._drain(worker, block=True)
+    
+    def _drain(self, worker: _Worker, block: bool) -> bool:
+        conn = worker.conn
+        try:
+            if not block and not conn.poll():
+                return False
+            kind, task_id, payload = conn.recv()
+        except (EOFError, OSError):
+            if block:
+                worker.process.join(timeout=5)
+                self._restart(worker, 'connection lost')
+            return False
+        
+        worker.last_seen = time.monotonic()
+        if kind == 'ready':
+            worker.pid = payload
+            worker.ready.set()
+            logger.info(f"Worker ready: {worker.kind}-{worker.index} (pid {payload})")
+            return True
+        if kind == 'failed':
+            self._fail_worker(worker, payload)
+            return True
+        
+        with self._lock:
+            task = worker.inflight.pop(task_id, None)
+            worker.completed += 1
+        if task is not None:
+            if kind == 'done':
+                self._finish(task, payload)
+            else:
+                self._finish(task, error=payload)
+        return True
+    
+    def _fail_worker(self, worker: _Worker, error: str):
+        """Model kurulamadı; bu işçi yeniden başlatılmaz, görevleri başka işçiye gider"""
+        logger.error(f"Worker failed to start: {worker.kind}-{worker.index}: {error}")
+        with self._lock:
+            worker.failed = error
+            tasks = list(worker.inflight.values())
+            worker.inflight.clear()
+        worker.conn.close()
+        for task in tasks:
+            self._dispatch(task)
+    
+    def _restart(self, worker: _Worker, reason: str):
+        if self._closed or worker.failed:
+            return
+        with self._lock:
+            tasks = list(worker.inflight.values())
+            worker.inflight.clear()
+            worker.conn.close()
+            if worker.process.is_alive():
+                worker.process.kill()
+            worker.process.join(timeout=5)
+            worker.restarts += 1
+            logger.warning(f"Restarting worker {worker.kind}-{worker.index} ({reason}), "
+                           f"{len(tasks)} task(s) in flight")
+            self._start(worker)
+        
+        for task in sorted(tasks, key=lambda t: t.id):
+            task.attempts += 1
+            if task.attempts > self.max_retries:
+                self._finish(task, error=WorkerCrashedError(
+                    f"{task.kind}.{task.method} işçisi çöktü ({reason}), {task.attempts} deneme"))
+            else:
+                self._dispatch(task)
+    
+    def _watch(self):
+        """Sağlık denetimi: en eski görevi `task_timeout_s` süresini aşan işçi sonlandırılır"""
+        while not self._closed:
+            time.sleep(self.health_interval_s)
+            now = time.monotonic()
+            with self._lock:
+                stuck = [worker for worker in self._all_workers()
+                         if worker.inflight and worker.process.is_alive()
+                         and now - min(t.sent_at for t in worker.inflight.values()) > self.task_timeout_s]
+            for worker in stuck:
+                logger.error(f"Worker {worker.kind}-{worker.index} exceeded {self.task_timeout_s} s, killing")
+                # Toplayıcı süreç bitişini görüp yeniden başlatır
+                worker.process.kill()
+    
+    def ping(self, timeout: float = 5.0) -> Dict[str, List[bool]]:
+        """Her işçiye boş görev gönderir; süre içinde yanıt verenler True"""
+        tasks = {}
+        for worker in self._all_workers():
+            if worker.failed:
+                continue
+            task = _Task(next(self._task_ids), worker.kind, 'ping', ())
+            task.future.set_running_or_notify_cancel()
+            self._dispatch(task, worker)
+            tasks[worker] = task
+        
+        deadline = time.monotonic() + timeout
+        status = {}
+        for kind, workers in self._workers.items():
+            status[kind] = []
+            for worker in workers:
+                task = tasks.get(worker)
+                if task is None:
+                    # Başlatılamamış işçiye ping gönderilmedi
+                    status[kind].append(False)
+                    continue
+                try:
+                    task.future.result(max(0.0, deadline - time.monotonic()))
+                    status[kind].append(True)
+                except Exception:
+                    status[kind].append(False)
+        return status
+    
+    def health(self) -> Dict:
+        """İşçi durumları ve halka doluluğu"""
+        now = time.monotonic()
+        with self._lock:
+            workers = {
+                kind: [{
+                    'pid': worker.pid,
+                    'alive': worker.process.is_alive(),
+                    'ready': worker.ready.is_set(),
+                    'failed': worker.failed,
+                    'inflight': len(worker.inflight),
+                    'completed': worker.completed,
+                    'restarts': worker.restarts,
+                    'last_seen_s': now - worker.last_seen
+                } for worker in workers]
+                for kind, workers in self._workers.items()
+            }
+        return {
+            'workers': workers,
+            'ring': {'slots': self.ring.slots, 'free_slots': self.ring.free_slots(),
+                     'slot_mb': self.ring.slot_bytes / MB}
+        }
+    
+    def close(self):
+        """İşçileri durdurur ve paylaşımlı belleği siler"""
+        if self._closed:
+            return
+        self._closed = True
+        # Başlatma yarıda kaldıysa bazı işçiler ve toplayıcı hiç başlamamış olabilir
+        started = [worker for worker in self._all_workers() if worker.process is not None]
+        for worker in started:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        if self._collector is not None:
+            self._collector.join()
+        for worker in started:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+            for task in worker.inflight.values():
+                task.future.set_exception(RuntimeError('WorkerPool kapatıldı'))
+            worker.inflight.clear()
+        self.ring.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()